@@ -1,19 +1,23 @@
 # ai_utils.py
 import json
+import os
+import re
+import sqlite3
+import threading
 import google.generativeai as genai
+import redis
 
-def clean_name_with_gemini(raw_first_name: str, last_name: str, api_key: str) -> str:
-    """
-    Uses the Gemini API to clean a name and returns the result.
-    It now returns a tuple: (success_boolean, result_string)
-    """
-    if not api_key or "YOUR_API_KEY" in api_key:
-        return False, "API key not configured"
-    
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        prompt = f"""
+# How many names go into a single Gemini prompt.
+NAME_BATCH_SIZE = int(os.getenv('NAME_BATCH_SIZE', '50'))
+# 'redis' shares the cache across workers; 'sqlite' keeps it in a local file.
+NAME_CACHE_BACKEND = os.getenv('NAME_CACHE_BACKEND', 'redis')
+NAME_CACHE_PATH = os.getenv('NAME_CACHE_PATH', 'name_cache.sqlite3')
+NAME_CACHE_KEY = 'name_cache:v1'
+# Points the Gemini client at another REST endpoint, e.g. the benchmark's fake
+# Gemini server (http://127.0.0.1:8003). Unset means the real API.
+GEMINI_API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT')
+
+CLEANING_RULES = """
         You are an expert data cleaner preparing names for a legal directory search.
         Your task is to extract the most probable first name and ensure it contains ONLY alphabetic characters.
         - Strict Rule: Remove all non-alphabetic symbols like periods (.), hyphens (-), and quotation marks (').
@@ -21,18 +25,214 @@ def clean_name_with_gemini(raw_first_name: str, last_name: str, api_key: str) ->
         - For "Joseph 'Joe'", the first name is "Joseph".
         - For a single initial like "R.", the first name must be cleaned to "R".
         - For a hyphenated name like "Mary-Beth", the first name is "Mary".
-        Analyze the following full name:
-        First Name (raw): "{raw_first_name}"
-        Last Name: "{last_name}"
-        Return a JSON object with a single key "cleaned_first_name".
+"""
+
+_stats = {'cache_hits': 0, 'cache_misses': 0, 'rule_based': 0, 'llm_calls': 0, 'llm_names': 0}
+_stats_lock = threading.Lock()
+_models = {}
+_models_lock = threading.Lock()
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+def get_name_cleaning_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+def reset_name_cleaning_stats():
+    """Starts the counters over, so they describe only the job about to run in this process."""
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+
+def normalize_name_key(raw_first_name, last_name):
+    """Cache key for a raw name pair: case- and whitespace-insensitive."""
+    first = " ".join(str(raw_first_name or '').split()).lower()
+    last = " ".join(str(last_name or '').split()).lower()
+    return f"{first}|{last}"
+
+# Nicknames written as "Joseph 'Joe'", 'Joseph "Joe"' or "Joseph (Joe)". A
+# quote only opens or closes a nickname at a word boundary, so the apostrophe
+# in "D'Andre" is not one.
+_NICKNAME = re.compile(r"""(?<!\w)(?:(['"]).*?\1|‘.*?’|“.*?”)(?!\w)|\(.*?\)""")
+_INITIAL = re.compile(r"^[A-Za-z]\.?$")
+# Periods and apostrophes inside a token ("W.Michael", "D'Andre", "O'Neal")
+# leave more than one reading; those names go to the model.
+_AMBIGUOUS_PUNCTUATION = re.compile(r"[.'‘’]")
+
+def rule_based_clean(raw_first_name):
+    """
+    Deterministically cleans the common cases covered by the Gemini prompt
+    (initials, quoted nicknames, hyphens). Returns None when the name is
+    ambiguous and should go to the model.
+    """
+    name = _NICKNAME.sub(' ', str(raw_first_name or '')).strip()
+    tokens = name.split()
+    if not tokens:
+        return None
+    if any(_AMBIGUOUS_PUNCTUATION.search(token) and not _INITIAL.match(token) for token in tokens):
+        return None
+
+    # "W. Michael" -> "Michael": skip leading initials when a full name follows.
+    full_names = [token for token in tokens if not _INITIAL.match(token)]
+    if len(full_names) > 1:
+        return None
+    if full_names:
+        candidate = full_names[0]
+    elif len(tokens) == 1:
+        candidate = tokens[0]
+    else:
+        return None
+
+    # "Mary-Beth" -> "Mary"
+    candidate = candidate.split('-')[0]
+    cleaned = "".join(filter(str.isalpha, candidate))
+    return cleaned or None
+
+class _RedisNameCache:
+    def __init__(self):
+        self.conn = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+
+    def get_many(self, keys):
+        values = self.conn.hmget(NAME_CACHE_KEY, keys)
+        return {key: value.decode('utf-8') for key, value in zip(keys, values) if value is not None}
+
+    def set_many(self, mapping):
+        self.conn.hset(NAME_CACHE_KEY, mapping=mapping)
+
+class _SqliteNameCache:
+    def __init__(self, path=NAME_CACHE_PATH):
+        self.path = path
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS name_cache (key TEXT PRIMARY KEY, cleaned TEXT NOT NULL)")
+
+    def get_many(self, keys):
+        found = {}
+        with sqlite3.connect(self.path) as conn:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(conn.execute(f"SELECT key, cleaned FROM name_cache WHERE key IN ({placeholders})", chunk).fetchall())
+        return found
+
+    def set_many(self, mapping):
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany("INSERT OR REPLACE INTO name_cache (key, cleaned) VALUES (?, ?)", list(mapping.items()))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_name_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = _SqliteNameCache() if NAME_CACHE_BACKEND == 'sqlite' else _RedisNameCache()
+    return _cache
+
+def _get_model(api_key):
+    """Configures the SDK and builds the model once per API key, not once per row."""
+    with _models_lock:
+        if api_key not in _models:
+            if GEMINI_API_ENDPOINT:
+                genai.configure(api_key=api_key, transport='rest', client_options={'api_endpoint': GEMINI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=api_key)
+            _models[api_key] = genai.GenerativeModel('gemini-1.5-flash')
+        return _models[api_key]
+
+def _clean_batch_with_gemini(pairs, api_key):
+    """Sends many (raw_first_name, last_name) pairs in one prompt. Returns a list of names or None."""
+    model = _get_model(api_key)
+    names = [{"index": i, "first_name_raw": first, "last_name": last} for i, (first, last) in enumerate(pairs)]
+    prompt = f"""{CLEANING_RULES}
+        Apply these rules to every name in the following JSON array:
+        {json.dumps(names)}
+        Return a JSON array with one object per input, in the same order, each with
+        the keys "index" and "cleaned_first_name".
         """
-        response = model.generate_content(prompt, request_options={"timeout": 30})
-        data = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
-        cleaned_name = data.get("cleaned_first_name")
-
-        if not cleaned_name:
-            return False, "AI returned an empty response"
-        
-        return True, cleaned_name
-    except Exception as e:
-        return False, f"AI cleaning error: {e}"
\ No newline at end of file
+    _count('llm_calls')
+    _count('llm_names', len(pairs))
+    response = model.generate_content(prompt, request_options={"timeout": 60})
+    data = json.loads(response.text.strip().replace("```json", "").replace("```", ""))
+
+    cleaned = [None] * len(pairs)
+    for item in data:
+        index = item.get("index")
+        if isinstance(index, int) and 0 <= index < len(pairs):
+            cleaned[index] = item.get("cleaned_first_name") or None
+    return cleaned
+
+def clean_names_batch(pairs, api_key):
+    """
+    Cleans a list of (raw_first_name, last_name) pairs and returns a list of
+    (success_boolean, result_string) tuples in the same order. Names are
+    resolved by the local rules first, then the persistent cache, and only the
+    remaining misses are sent to Gemini, NAME_BATCH_SIZE names per call.
+    """
+    results = [None] * len(pairs)
+    pending = {}
+    for position, (raw_first_name, last_name) in enumerate(pairs):
+        if not str(raw_first_name or '').strip():
+            results[position] = (False, "No first name to clean")
+            continue
+        cleaned = rule_based_clean(raw_first_name)
+        if cleaned:
+            _count('rule_based')
+            results[position] = (True, cleaned)
+        else:
+            pending.setdefault(normalize_name_key(raw_first_name, last_name), []).append(position)
+
+    if not pending:
+        return results
+
+    keys = list(pending)
+    try:
+        cached = get_name_cache().get_many(keys)
+    except Exception:
+        cached = {}
+    _count('cache_hits', len(cached))
+    _count('cache_misses', len(keys) - len(cached))
+    for key, cleaned in cached.items():
+        for position in pending[key]:
+            results[position] = (True, cleaned)
+
+    misses = [key for key in keys if key not in cached]
+    if misses and (not api_key or "YOUR_API_KEY" in api_key):
+        for key in misses:
+            for position in pending[key]:
+                results[position] = (False, "API key not configured")
+        return results
+
+    for start in range(0, len(misses), NAME_BATCH_SIZE):
+        batch_keys = misses[start:start + NAME_BATCH_SIZE]
+        batch_pairs = [pairs[pending[key][0]] for key in batch_keys]
+        try:
+            cleaned_names = _clean_batch_with_gemini(batch_pairs, api_key)
+        except Exception as e:
+            for key in batch_keys:
+                for position in pending[key]:
+                    results[position] = (False, f"AI cleaning error: {e}")
+            continue
+
+        to_cache = {}
+        for key, cleaned in zip(batch_keys, cleaned_names):
+            outcome = (True, cleaned) if cleaned else (False, "AI returned an empty response")
+            for position in pending[key]:
+                results[position] = outcome
+            if cleaned:
+                to_cache[key] = cleaned
+        if to_cache:
+            try:
+                get_name_cache().set_many(to_cache)
+            except Exception:
+                pass
+
+    return results
+
+def clean_name_with_gemini(raw_first_name: str, last_name: str, api_key: str) -> str:
+    """
+    Cleans a single name and returns the result.
+    It now returns a tuple: (success_boolean, result_string)
+    """
+    return clean_names_batch([(raw_first_name, last_name)], api_key)[0]
@@ -1,17 +1,21 @@
 # backend/app.py
 
 import os
+import time
 import uuid
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-import pandas as pd
-import io
 import json
 import redis
 from rq import Queue
 
-# Import the task function
-from tasks import run_scraper_task
+# Import the job helpers
+from sharding import enqueue_verification, has_active_chunks, resume_verification
+from ingest import IngestError, delete_input, ingest_upload
+from result_store import count_results, iter_results_csv, read_results_page
+from progress import get_progress
+from verifiers import VERIFIERS
+from metrics import render_metrics
 
 # Setup Flask App and Redis/RQ connection
 app = Flask(__name__)
@@ -19,6 +23,14 @@ CORS(app)
 redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
 redis_conn = redis.from_url(redis_url)
 q = Queue(connection=redis_conn)
+# SSE connections are closed after a while; EventSource reconnects on its own.
+SSE_POLL_SECONDS = 1.0
+SSE_MAX_SECONDS = 300
+
+@app.route('/states', methods=['GET'])
+def list_states():
+    """The state bars a roster can be verified against."""
+    return jsonify({"states": [{"name": verifier.name, "label": verifier.label} for verifier in VERIFIERS.values()]})
 
 @app.route('/start-scraping', methods=['POST'])
 def start_scraping():
@@ -33,47 +45,156 @@ def start_scraping():
     api_key = request.form.get('apiKey')
     state = request.form.get('state')
     mapping_json = request.form.get('mapping')
+    workers = request.form.get('workers', type=int)
+    force_refresh = request.form.get('forceRefresh', 'false').lower() == 'true'
 
     if not all([api_key, state, mapping_json]):
         return jsonify({"error": "API key, state, or mapping is missing"}), 400
 
     try:
         column_mapping = json.loads(mapping_json)
-        csv_data = pd.read_csv(file.stream.read().decode("UTF8"))
-        
-        # Rename columns based on user's mapping before passing to the task
-        rename_map = {v: k for k, v in column_mapping.items()}
-        csv_data.rename(columns=rename_map, inplace=True)
-
-        # Enqueue the job. The worker will pick this up.
-        # We pass the dataframe as a JSON string to make it queue-safe.
-        job = q.enqueue(
-            run_scraper_task,
-            job_id=str(uuid.uuid4()), # Create a unique ID for this job
-            args=(state, csv_data.to_json(orient='records'), api_key, column_mapping),
-            job_timeout='2h' # Allow the job to run for up to 2 hours
-        )
+        job_id = str(uuid.uuid4()) # Create a unique ID for this job
+
+        # Stream the mapped columns into Redis once, validating rows as we go,
+        # so problems are reported now rather than partway through the job.
+        input_ref, summary = ingest_upload(redis_conn, file.stream, column_mapping, state, job_id)
+        if summary['total_rows'] == 0:
+            delete_input(redis_conn, input_ref)
+            return jsonify({"error": "The uploaded CSV has no rows"}), 400
+        if summary['invalid_rows'] == summary['total_rows']:
+            delete_input(redis_conn, input_ref)
+            return jsonify({"error": "No row in the uploaded CSV is valid", **summary}), 400
+
+        # Enqueue the job (or, for large uploads, its chunk jobs and merge step).
+        # The workers will pick this up.
+        enqueue_verification(q, redis_conn, job_id, state, input_ref, api_key, column_mapping, workers, force_refresh)
         
-        return jsonify({"job_id": job.id}), 202 # 202 Accepted
+        return jsonify({"job_id": job_id, **summary}), 202 # 202 Accepted
 
+    except IngestError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
 
+def public_meta(job):
+    """job.meta without the bookkeeping clients don't need (a sharded job's chunk IDs)."""
+    return {key: value for key, value in job.meta.items() if key != 'chunk_ids'}
+
 @app.route('/status/<job_id>', methods=['GET'])
 def get_status(job_id):
     """
     This endpoint is polled by the frontend to get live updates
-    on the job's status, logs, and results.
+    on the job's status, logs, and results. Only log lines after ?since=
+    are returned, and results are paged with ?offset=&limit= in the order
+    records finished.
     """
     job = q.fetch_job(job_id)
     if job:
-        logs = [log.decode('utf-8') for log in redis_conn.lrange(f"logs:{job_id}", 0, -1)]
+        since = max(request.args.get('since', 0, type=int), 0)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = min(max(request.args.get('limit', 100, type=int), 0), 1000)
+        logs = [log.decode('utf-8') for log in redis_conn.lrange(f"logs:{job_id}", since, -1)]
+        items = read_results_page(redis_conn, job_id, offset, limit)
+        progress = get_progress(redis_conn, job_id)
         response_object = {
             "id": job.id,
             "status": job.get_status(),
-            "meta": job.meta,
-            "logs": logs
+            "meta": public_meta(job),
+            "logs": logs,
+            "next_since": since + len(logs),
+            "progress": progress,
+            "chunks": progress['chunks'] if progress else None,
+            "results": {
+                "offset": offset,
+                "limit": limit,
+                "total": count_results(redis_conn, job_id),
+                "next_offset": offset + len(items),
+                "items": items
+            }
         }
         return jsonify(response_object), 200
     else:
-        return jsonify({"error": "Job not found"}), 404
\ No newline at end of file
+        return jsonify({"error": "Job not found"}), 404
+
+@app.route('/stream/<job_id>', methods=['GET'])
+def stream_status(job_id):
+    """
+    Server-Sent Events alternative to polling /status. Emits 'log' events
+    (event id = log offset, so EventSource reconnects resume where they left
+    off), 'progress' events and a final 'end' event once the job is done.
+    """
+    job = q.fetch_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    since = request.headers.get('Last-Event-ID', type=int) or request.args.get('since', 0, type=int)
+
+    def events():
+        offset = since
+        last_progress = None
+        deadline = time.monotonic() + SSE_MAX_SECONDS
+        while time.monotonic() < deadline:
+            for log in redis_conn.lrange(f"logs:{job_id}", offset, -1):
+                offset += 1
+                yield f"id: {offset}\nevent: log\ndata: {json.dumps(log.decode('utf-8'))}\n\n"
+            progress = get_progress(redis_conn, job_id)
+            if progress != last_progress:
+                last_progress = progress
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            status = job.get_status(refresh=True)
+            if status in ('finished', 'failed', 'stopped', 'canceled'):
+                yield f"event: end\ndata: {json.dumps({'status': status, 'meta': public_meta(job)})}\n\n"
+                return
+            yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_SECONDS)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/results/<job_id>.csv', methods=['GET'])
+def download_results(job_id):
+    """
+    Streams the job's results as CSV in input order, straight from Redis,
+    without building the whole table in memory.
+    """
+    job = q.fetch_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    total_rows = job.meta.get('total_rows', 0)
+    return Response(
+        stream_with_context(iter_results_csv(redis_conn, job_id, total_rows)),
+        mimetype='text/csv',
+        headers={"Content-Disposition": f"attachment; filename=verification_results_{job_id}.csv"}
+    )
+
+@app.route('/resume/<job_id>', methods=['POST'])
+def resume_job(job_id):
+    """
+    Re-enqueues a failed, timed-out or stopped job under the same ID. The
+    worker reads the job's checkpoint and only processes the remaining rows.
+    """
+    job = q.fetch_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    if job.get_status() in ('queued', 'started', 'deferred') or has_active_chunks(redis_conn, job):
+        return jsonify({"error": f"Job is {job.get_status()}; nothing to resume"}), 409
+
+    redis_conn.delete(f"stop:{job_id}")
+    resumed = resume_verification(q, redis_conn, job)
+    redis_conn.rpush(f"logs:{job_id}", "\n--- [Module Resume] Job re-enqueued; continuing from the last checkpoint. ---")
+    return jsonify({"job_id": resumed.id}), 202
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint: stage latencies, record and job counts, queue depth."""
+    return Response(render_metrics(redis_conn, q), mimetype='text/plain; version=0.0.4')
+
+@app.route('/stop/<job_id>', methods=['POST'])
+def stop_job(job_id):
+    """
+    Asks a running job to stop. The worker finishes the records it is on,
+    keeps the results so far and marks the job as stopped.
+    """
+    job = q.fetch_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    redis_conn.set(f"stop:{job_id}", 1, ex=24 * 3600)
+    return jsonify({"id": job_id, "stop_requested": True}), 202
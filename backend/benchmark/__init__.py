@@ -0,0 +1 @@
+# backend/benchmark/__init__.py
@@ -0,0 +1,66 @@
+# backend/benchmark/roster.py
+
+import csv
+import io
+import random
+from datetime import date, timedelta
+
+FIRST_NAMES = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+               'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen']
+SECOND_NAMES = ['Ann', 'Beth', 'Lee', 'Lynn', 'Jo', 'Ray', 'Sue', 'Jean']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+STATUSES = ['Active', 'Active', 'Active', 'Inactive', 'Suspended']
+DISCIPLINES = ['', '', '', 'Public Reproval', 'Probation']
+
+ROSTER_COLUMNS = ['First Name', 'Last Name', 'Admit Date']
+COLUMN_MAPPING = {'first name': 'First Name', 'last name': 'Last Name', 'admit date': 'Admit Date'}
+
+def _suffix(index):
+    """Letters that make the index-th last name unique, e.g. 0 -> 'a', 27 -> 'bb'."""
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('a') + remainder) + letters
+    return letters
+
+def roster_row(index, seed=0, not_found_rate=0.1, ambiguous_rate=0.1):
+    """
+    The index-th synthetic attorney. Every row is generated from its own seed,
+    so the first N rows of a larger roster are the roster of N rows, and the
+    stub directory and the uploaded CSV agree without sharing a file.
+
+    'raw first' is what the roster contains; 'search first' is the name the
+    scraper searches for once it is cleaned (by the local rules, or by the
+    fake Gemini endpoint for the ambiguous two-word names).
+    """
+    rng = random.Random(f"{seed}-{index}")
+    first = rng.choice(FIRST_NAMES)
+    roll = rng.random()
+    if roll < ambiguous_rate:
+        raw_first = f"{first} {rng.choice(SECOND_NAMES)}"
+    elif roll < ambiguous_rate + 0.1:
+        raw_first = f"{rng.choice('ABCDEFGHJKLMNPRSTW')}. {first}"
+    else:
+        raw_first = first
+    admitted = date(1975, 1, 1) + timedelta(days=rng.randrange(45 * 365))
+    return {
+        'raw first': raw_first,
+        'search first': first,
+        'last': f"{rng.choice(LAST_NAMES)}{_suffix(index)}",
+        'admitted': admitted,
+        'listed': rng.random() >= not_found_rate,
+        'status': rng.choice(STATUSES),
+        'discipline': rng.choice(DISCIPLINES),
+    }
+
+def roster_csv(rows, seed=0, not_found_rate=0.1, ambiguous_rate=0.1):
+    """The first `rows` synthetic attorneys as an uploaded CSV (bytes)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(ROSTER_COLUMNS)
+    for index in range(rows):
+        row = roster_row(index, seed, not_found_rate, ambiguous_rate)
+        writer.writerow([row['raw first'], row['last'], row['admitted'].strftime('%m/%d/%Y')])
+    return buffer.getvalue().encode('utf-8')
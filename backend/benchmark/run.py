@@ -0,0 +1,203 @@
+# backend/benchmark/run.py
+#
+# Offline throughput benchmark. Serves stub copies of the bar directory sites
+# and Gemini (see stub_server.py), then runs run_scraper_task end to end on
+# synthetic rosters, each size in a fresh process so peak RSS is its own.
+# Run from backend/ against a Redis database the benchmark may wipe:
+#
+#     python -m benchmark.run --state california --sizes 100 1000 10000
+#     python -m benchmark.run --state georgia --latency 0.2 --error-rate 0.05 --json results.json
+#
+# Every size reports rows/sec, p50/p95 per-record latency (lookups only;
+# rows answered from the input or the result cache are not records), peak
+# RSS, and the bytes the job sent to Redis. Worker settings such as
+# SCRAPER_WORKERS or RETRY_BASE_DELAY can be overridden through the
+# environment as usual.
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from benchmark.roster import COLUMN_MAPPING, roster_csv
+from benchmark.stub_server import add_stub_arguments, build_directory, start_stub_servers
+
+STATES = ('california', 'georgia')
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_REDIS_URL = 'redis://localhost:6379/15'
+API_KEY = 'benchmark-key'
+QUEUE_NAME = 'benchmark'
+
+# Applied unless already set in the environment: retries and circuit pauses
+# short enough that a run with failures injected still finishes quickly.
+WORKER_DEFAULTS = {
+    'RETRY_BASE_DELAY': '0.1',
+    'RETRY_MAX_DELAY': '1',
+    'CIRCUIT_COOLDOWN': '5',
+}
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers, or None if it is empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))]
+
+def _peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def run_size(args):
+    """
+    Child process: ingests a roster of args.child_rows rows, runs
+    run_scraper_task on it in this process with an RQ SimpleWorker, and
+    writes the measurements to args.child_output as JSON.
+    """
+    import redis
+    from rq import Queue, SimpleWorker
+    import tasks
+    from ingest import ingest_upload
+
+    redis_conn = redis.from_url(os.environ['REDIS_URL'])
+    redis_conn.flushdb()
+
+    ingest_started = time.monotonic()
+    upload = io.BytesIO(roster_csv(args.child_rows, args.seed, args.not_found_rate, args.ambiguous_rate))
+    input_ref, summary = ingest_upload(redis_conn, upload, COLUMN_MAPPING, args.state, str(uuid.uuid4()))
+    ingest_seconds = time.monotonic() - ingest_started
+
+    # Time every record that goes through a lookup.
+    record_seconds = []
+    verify_record = tasks.verify_record
+    def timed_verify_record(*verify_args, **verify_kwargs):
+        started = time.monotonic()
+        try:
+            return verify_record(*verify_args, **verify_kwargs)
+        finally:
+            record_seconds.append(time.monotonic() - started)
+    tasks.verify_record = timed_verify_record
+
+    queue = Queue(QUEUE_NAME, connection=redis_conn)
+    job = queue.enqueue(
+        tasks.run_scraper_task,
+        args=(args.state, input_ref, API_KEY, COLUMN_MAPPING, args.workers, True),
+        job_timeout='6h',
+    )
+    stats_before = redis_conn.info('stats')
+    memory_before = redis_conn.info('memory')['used_memory']
+    started = time.monotonic()
+    SimpleWorker([queue], connection=redis_conn).work(burst=True, logging_level='WARNING')
+    seconds = time.monotonic() - started
+    stats_after = redis_conn.info('stats')
+    job.refresh()
+
+    report = {
+        'state': args.state,
+        'rows': args.child_rows,
+        'invalid_rows': summary['invalid_rows'],
+        'status': job.meta.get('status'),
+        'seconds': round(seconds, 3),
+        'ingest_seconds': round(ingest_seconds, 3),
+        'rows_per_second': round(args.child_rows / seconds, 2) if seconds else None,
+        'records': len(record_seconds),
+        'record_p50_ms': round(_percentile(record_seconds, 0.5) * 1000, 1) if record_seconds else None,
+        'record_p95_ms': round(_percentile(record_seconds, 0.95) * 1000, 1) if record_seconds else None,
+        'peak_rss_bytes': _peak_rss_bytes(),
+        'redis_bytes_written': stats_after['total_net_input_bytes'] - stats_before['total_net_input_bytes'],
+        'redis_memory_delta_bytes': redis_conn.info('memory')['used_memory'] - memory_before,
+        'redis_commands': stats_after['total_commands_processed'] - stats_before['total_commands_processed'],
+    }
+    for key in ('stage_histograms', 'page_timings', 'rate_limiter', 'name_cleaning', 'job_cache', 'skipped_rows'):
+        report[key] = job.meta.get(key)
+    with open(args.child_output, 'w') as output:
+        json.dump(report, output)
+
+def child_env(args, stub_env):
+    env = dict(os.environ)
+    env.update(stub_env)
+    env['REDIS_URL'] = args.redis_url
+    env['SCRAPER_ENGINE'] = args.engine
+    env[f"{args.state.upper()}_MIN_INTERVAL"] = str(args.min_interval)
+    env[f"{args.state.upper()}_MAX_WORKERS"] = str(args.workers)
+    for name, value in WORKER_DEFAULTS.items():
+        env.setdefault(name, value)
+    return env
+
+def _mb(value):
+    return f"{value / (1024 * 1024):.1f}"
+
+def _ms(value):
+    return '-' if value is None else f"{value:.0f}"
+
+def print_report(reports):
+    columns = ('rows', 'status', 'seconds', 'rows/s', 'p50 ms', 'p95 ms', 'peak RSS MB', 'Redis MB written', 'site requests', 'Gemini calls')
+    lines = [columns]
+    for report in reports:
+        lines.append((
+            str(report['rows']), str(report['status']), f"{report['seconds']:.1f}", f"{report['rows_per_second'] or 0:.1f}",
+            _ms(report['record_p50_ms']), _ms(report['record_p95_ms']), _mb(report['peak_rss_bytes']),
+            _mb(report['redis_bytes_written']), str(report['stub']['requests']), str(report['stub']['gemini_calls']),
+        ))
+    widths = [max(len(line[column]) for line in lines) for column in range(len(columns))]
+    for line in lines:
+        print("  ".join(value.rjust(width) for value, width in zip(line, widths)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark run_scraper_task against local stub bar directory sites.")
+    parser.add_argument('--state', choices=STATES, default='california')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help="Roster sizes to run, in rows.")
+    parser.add_argument('--workers', type=int, default=3, help="Lookup workers per job.")
+    parser.add_argument('--engine', choices=('auto', 'selenium'), default='auto', help="SCRAPER_ENGINE for the job; 'selenium' needs Chrome.")
+    parser.add_argument('--min-interval', type=float, default=0.0, help="Seconds between two requests to a site (0 means 100 requests/second).")
+    parser.add_argument('--redis-url', default=DEFAULT_REDIS_URL, help="Redis database to use. It is flushed before every size.")
+    parser.add_argument('--json', dest='json_path', help="Also write the full reports, stage histograms included, to this file.")
+    add_stub_arguments(parser)
+    parser.add_argument('--child-rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child_rows is not None:
+        return run_size(args)
+
+    directory = build_directory(args, max(args.sizes))
+    servers, stub_env = start_stub_servers(directory)
+    env = child_env(args, stub_env)
+    print(f"Stub sites: {', '.join(f'{name}={value}' for name, value in stub_env.items())}")
+    print(f"Redis: {args.redis_url} (flushed before every size)\n")
+
+    reports = []
+    try:
+        for size in args.sizes:
+            stub_before = dict(directory.stats)
+            with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as output:
+                output_path = output.name
+            try:
+                subprocess.run(
+                    [sys.executable, '-m', 'benchmark.run', *sys.argv[1:], '--child-rows', str(size), '--child-output', output_path],
+                    env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), check=True,
+                )
+                with open(output_path) as output:
+                    report = json.load(output)
+            finally:
+                os.remove(output_path)
+            report['stub'] = {key: directory.stats[key] - stub_before[key] for key in directory.stats}
+            reports.append(report)
+            print(f"{args.state}: {size} rows in {report['seconds']:.1f}s ({report['status']})")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+    print()
+    print_report(reports)
+    if args.json_path:
+        with open(args.json_path, 'w') as output:
+            json.dump(reports, output, indent=2)
+
+if __name__ == '__main__':
+    main()
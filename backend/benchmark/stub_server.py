@@ -0,0 +1,285 @@
+# backend/benchmark/stub_server.py
+
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from benchmark.roster import roster_row
+
+# Local copies of the pages the verifiers read: the CalBar QuickSearch and
+# profile pages, the gabar.org member directory and profiles, and the Gemini
+# generateContent REST call. Only the markup the parsers and XPaths rely on
+# is reproduced. Each site is its own server on its own port, so the rate
+# limiter keys them as separate hosts, exactly like the real sites.
+
+class StubDirectory:
+    """
+    The synthetic attorneys behind the stub sites: the first `rows` roster
+    rows (see roster.roster_row) plus `results_per_search - 1` decoy profiles
+    per attorney, admitted in the same month but on another day.
+    """
+
+    def __init__(self, rows, seed=0, not_found_rate=0.1, ambiguous_rate=0.1, results_per_search=1,
+                 latency=0.05, jitter=0.05, error_rate=0.0, empty_rate=0.0, gemini_latency=0.5):
+        self.seed = seed
+        self.results_per_search = max(1, min(results_per_search, 28))
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.gemini_latency = gemini_latency
+        self.rows = [roster_row(index, seed, not_found_rate, ambiguous_rate) for index in range(rows)]
+        self.by_name = {}
+        for index, row in enumerate(self.rows):
+            if row['listed']:
+                self.by_name.setdefault(self._name_key(row['search first'], row['last']), []).append(index)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'empty': 0, 'gemini_calls': 0}
+
+    @staticmethod
+    def _name_key(first_name, last_name):
+        return f"{first_name} {last_name}".strip().lower()
+
+    def count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def search(self, first_name, last_name):
+        """Profile IDs for a name search, in the order the site lists them."""
+        profile_ids = []
+        for index in self.by_name.get(self._name_key(first_name, last_name), []):
+            profile_ids.extend(f"{index}-{number}" for number in range(self.results_per_search))
+        return profile_ids
+
+    def profile(self, profile_id):
+        """(attorney row, admit date) for a profile ID, or None if it doesn't exist."""
+        try:
+            index, number = (int(part) for part in profile_id.split('-'))
+            row = self.rows[index]
+        except (ValueError, IndexError):
+            return None
+        if number >= self.results_per_search:
+            return None
+        match_number = random.Random(f"{self.seed}-{index}-match").randrange(self.results_per_search)
+        admitted = row['admitted']
+        if number != match_number:
+            offset = (number - match_number) % self.results_per_search
+            admitted = admitted.replace(day=(admitted.day - 1 + offset) % 28 + 1)
+        return row, admitted
+
+    def site_failure(self):
+        """Sleeps for the configured latency, then returns None, 'error' or 'empty'."""
+        time.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+        self.count('requests')
+        roll = random.random()
+        if roll < self.error_rate:
+            self.count('errors')
+            return 'error'
+        if roll < self.error_rate + self.empty_rate:
+            self.count('empty')
+            return 'empty'
+        return None
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def directory(self):
+        return self.server.directory
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, body, status=200, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        failure = self.directory.site_failure()
+        if failure == 'error':
+            # Either of the throttling answers the real sites give.
+            status = random.choice((429, 503))
+            return self.send_body(f"<html><body>{status}</body></html>", status=status)
+        if failure == 'empty':
+            return self.send_body('')
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        body = self.render(url.path, params)
+        if body is None:
+            return self.send_body("<html><body>Not Found</body></html>", status=404)
+        self.send_body(f"<html><body>{body}</body></html>")
+
+class CalBarHandler(_StubHandler):
+    """apps.calbar.ca.gov: /attorney/LicenseeSearch/QuickSearch and /attorney/Licensee/Detail/<id>."""
+
+    def render(self, path, params):
+        if path == '/attorney/LicenseeSearch/QuickSearch':
+            return self.render_search(params.get('FreeText', ''))
+        if path.startswith('/attorney/Licensee/Detail/'):
+            return self.render_profile(path.rsplit('/', 1)[-1])
+        return None
+
+    def render_search(self, free_text):
+        first_name, _, last_name = free_text.rpartition(' ')
+        profile_ids = self.directory.search(first_name, last_name)
+        if not profile_ids:
+            return f'<div class="attSearchRes">Your search for "{html.escape(free_text)}" returned no results.</div>'
+        rows = []
+        for profile_id in profile_ids:
+            row, admitted = self.directory.profile(profile_id)
+            rows.append(
+                f'<tr><td><a href="/attorney/Licensee/Detail/{profile_id}">{html.escape(row["last"])}, {html.escape(row["search first"])}</a></td>'
+                f'<td>{row["status"]}</td><td>{profile_id}</td><td>Sacramento</td><td>{admitted.strftime("%B %Y")}</td></tr>'
+            )
+        return f'<table id="tblAttorney"><thead><tr><th>Name</th><th>Status</th><th>Number</th><th>City</th><th>Admission Date</th></tr></thead><tbody>{"".join(rows)}</tbody></table>'
+
+    def render_profile(self, profile_id):
+        found = self.directory.profile(profile_id)
+        if found is None:
+            return None
+        row, admitted = found
+        return (
+            f'<h3>{html.escape(row["search first"])} {html.escape(row["last"])} #{profile_id}</h3>'
+            f'<p><b>License Status:</b> {row["status"]}</p>'
+            '<table><tr><th>Date</th><th>License Status</th><th>Discipline</th></tr>'
+            f'<tr><td><strong>Present</strong></td><td>{row["status"]}</td><td>{row["discipline"]}</td></tr>'
+            f'<tr><td>{admitted.strftime("%m/%d/%Y")}</td><td>Admitted to the State Bar of California</td><td></td></tr>'
+            '</table>'
+        )
+
+class GabarHandler(_StubHandler):
+    """www.gabar.org: /member-directory/ searches and /member-directory/?id=<id> profiles."""
+
+    SEARCH_FORM = (
+        '<form method="get" action="/member-directory/">'
+        '<input name="firstName" type="text"><input name="lastName" type="text">'
+        '<div class="d-lg-flex"><button type="submit">Search</button></div></form>'
+    )
+
+    def render(self, path, params):
+        if path != '/member-directory/':
+            return None
+        if 'id' in params:
+            return self.render_profile(params['id'])
+        if 'firstName' not in params and 'lastName' not in params:
+            return self.SEARCH_FORM
+        profile_ids = self.directory.search(params.get('firstName', ''), params.get('lastName', ''))
+        if not profile_ids:
+            return f"{self.SEARCH_FORM}<p>No results found</p>"
+        links = "".join(
+            f'<li><a href="/member-directory/?id={profile_id}">{html.escape(params.get("firstName", ""))} {html.escape(params.get("lastName", ""))}</a></li>'
+            for profile_id in profile_ids
+        )
+        return f"{self.SEARCH_FORM}<ul>{links}</ul>"
+
+    def render_profile(self, profile_id):
+        found = self.directory.profile(profile_id)
+        if found is None:
+            return None
+        row, admitted = found
+        return (
+            f'<h1>{html.escape(row["search first"])} {html.escape(row["last"])}</h1>'
+            f'<p class="detail-item"><span>Admit Date</span> {admitted.strftime("%m/%d/%Y")}</p>'
+            f'<p class="detail-item"><span>Status</span> {row["status"]}</p>'
+            f'<div class="detail-item mb-3"><span>Public Discipline</span> {row["discipline"] or "None"}</div>'
+        )
+
+class GeminiHandler(_StubHandler):
+    """
+    POST /v1beta/models/<model>:generateContent. Answers the name-cleaning
+    prompt of ai_utils with the first word of each name, letters only.
+    """
+
+    GENERATE_PATH = re.compile(r'^/v1beta/models/[^/:]+:generateContent$')
+    NAMES_JSON = re.compile(r'\[\{"index".*\}\]')
+
+    def do_GET(self):
+        self.send_body('{}', status=404, content_type='application/json')
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.GENERATE_PATH.match(urlparse(self.path).path):
+            return self.send_body('{}', status=404, content_type='application/json')
+        time.sleep(self.directory.gemini_latency)
+        self.directory.count('gemini_calls')
+
+        prompt = "".join(part.get('text', '') for content in json.loads(body).get('contents', []) for part in content.get('parts', []))
+        names_json = self.NAMES_JSON.search(prompt)
+        names = json.loads(names_json.group(0)) if names_json else []
+        cleaned = []
+        for name in names:
+            first_word = (name.get('first_name_raw') or '').split()
+            cleaned.append({
+                'index': name.get('index'),
+                'cleaned_first_name': "".join(filter(str.isalpha, first_word[0].split('-')[0])) if first_word else '',
+            })
+        response = {
+            'candidates': [{
+                'content': {'parts': [{'text': f"```json\n{json.dumps(cleaned)}\n```"}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0,
+            }],
+        }
+        self.send_body(json.dumps(response), content_type='application/json')
+
+def start_stub_servers(directory, host='127.0.0.1', ports=(0, 0, 0)):
+    """
+    Serves the three stub sites from background threads. Returns (servers,
+    env) where `env` holds the CALBAR_BASE_URL, GABAR_BASE_URL and
+    GEMINI_API_ENDPOINT values that point the app at them.
+    """
+    servers = []
+    for handler, port in zip((CalBarHandler, GabarHandler, GeminiHandler), ports):
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        server.request_queue_size = 128
+        server.directory = directory
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    calbar, gabar, gemini = (f"http://{host}:{server.server_address[1]}" for server in servers)
+    return servers, {'CALBAR_BASE_URL': calbar, 'GABAR_BASE_URL': gabar, 'GEMINI_API_ENDPOINT': gemini}
+
+def add_stub_arguments(parser):
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic roster and directory.")
+    parser.add_argument('--not-found-rate', type=float, default=0.1, help="Share of attorneys missing from the directory.")
+    parser.add_argument('--ambiguous-rate', type=float, default=0.1, help="Share of first names only Gemini can clean.")
+    parser.add_argument('--results-per-search', type=int, default=1, help="Profiles listed per name search (1 match plus decoys, at most 28).")
+    parser.add_argument('--latency', type=float, default=0.05, help="Mean seconds each site page takes.")
+    parser.add_argument('--jitter', type=float, default=0.02, help="Latency varies uniformly by +/- this many seconds.")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of page requests answered with 429/503.")
+    parser.add_argument('--empty-rate', type=float, default=0.0, help="Share of page requests answered with an empty page.")
+    parser.add_argument('--gemini-latency', type=float, default=0.5, help="Seconds each fake Gemini call takes.")
+
+def build_directory(args, rows):
+    return StubDirectory(
+        rows, seed=args.seed, not_found_rate=args.not_found_rate, ambiguous_rate=args.ambiguous_rate,
+        results_per_search=args.results_per_search, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, empty_rate=args.empty_rate, gemini_latency=args.gemini_latency,
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve the stub CalBar, gabar.org and Gemini sites until interrupted.")
+    add_stub_arguments(parser)
+    parser.add_argument('--rows', type=int, default=10000, help="Synthetic attorneys in the directory.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--ports', type=int, nargs=3, default=(8001, 8002, 8003), metavar=('CALBAR', 'GABAR', 'GEMINI'))
+    args = parser.parse_args()
+
+    _, env = start_stub_servers(build_directory(args, args.rows), args.host, args.ports)
+    print("Stub sites are up. Point a worker at them with:")
+    for name, value in env.items():
+        print(f"  export {name}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
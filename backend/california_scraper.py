@@ -1,145 +1,136 @@
 # backend/california_scraper.py
 
-import pandas as pd
-from selenium import webdriver
+import os
+from datetime import datetime
+from urllib.parse import urlencode, urljoin
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
-from datetime import datetime
-from ai_utils import clean_name_with_gemini
-
-def run_california_verification(california_df, gemini_api_key, log_func):
-    log_func("--- [Module Start] Starting California Bar Verification ---")
-    
-    output_data = []
-    base_url = "https://apps.calbar.ca.gov/attorney/LicenseeSearch/QuickSearch"
-
-    for index, row in california_df.iterrows():
-        driver = None
-        try:
-            options = webdriver.ChromeOptions()
-            options.add_experimental_option('excludeSwitches', ['enable-logging'])
-            options.add_argument("--headless")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--single-process")
-            service = Service(ChromeDriverManager().install())
-            driver = webdriver.Chrome(service=service, options=options)
-            wait = WebDriverWait(driver, 15)
-
-            raw_first_name = str(row.get('first name', '')).strip()
-            last_name = str(row.get('last name', '')).strip()
-            admit_date_to_find = str(row.get('admit date', '')).strip()
-
-            if not raw_first_name and not last_name: continue
-
-            log_func(f"\n  [Record {index+1}] Processing: '{raw_first_name} {last_name}'")
-            current_result = {'first name': raw_first_name, 'last name': last_name, 'admit date': admit_date_to_find, 'state': 'california', 'status': '', 'discipline': '', 'profile links': '', 'unmatched profile links': ''}
-
-            success, result = clean_name_with_gemini(raw_first_name, last_name, gemini_api_key)
-            if success:
-                log_func(f"    -> AI cleaned '{raw_first_name}' to '{result}'.")
-                first_name = result
-            else:
-                log_func(f"    -> WARNING: {result}. Using basic cleaning.")
-                first_name = "".join(filter(str.isalpha, raw_first_name.split()[0])) if raw_first_name else ""
-            
-            search_name = f"{first_name} {last_name}".strip()
-
-            if not search_name or not admit_date_to_find:
-                log_func("    -> SKIPPED: Missing name or admit date after cleaning.")
-                current_result['status'] = "Missing Input Data"
-                output_data.append(current_result)
-                continue
+from selenium.common.exceptions import NoSuchElementException
+from engine import StateVerifier
+from http_lookup import PageParseError, fetch_page, label_value
 
-            try:
-                input_admit_date_obj = datetime.strptime(admit_date_to_find, '%m/%d/%Y')
-            except ValueError:
-                log_func(f"    -> SKIPPED: Invalid date format '{admit_date_to_find}'.")
-                current_result['status'] = "Invalid Input Date Format"
-                output_data.append(current_result)
-                continue
+CALBAR_BASE_URL = os.getenv('CALBAR_BASE_URL', 'https://apps.calbar.ca.gov')
+BASE_URL = f"{CALBAR_BASE_URL}/attorney/LicenseeSearch/QuickSearch"
 
-            log_func(f"    -> Navigating and searching for '{search_name}'...")
-            driver.get(base_url)
-            search_field = wait.until(EC.presence_of_element_located((By.ID, "FreeText")))
-            search_button = driver.find_element(By.ID, "btn_quicksearch")
-            search_field.clear(); search_field.send_keys(search_name)
-            search_button.click()
+class CaliforniaVerifier(StateVerifier):
+    """The State Bar of California QuickSearch."""
+    name = 'california'
+    base_url = BASE_URL
+    label = 'California'
+    wait_timeout = 15
 
-            wait.until(EC.any_of(EC.presence_of_element_located((By.ID, "tblAttorney")), EC.presence_of_element_located((By.CLASS_NAME, "attSearchRes"))))
+    date_format = '%m/%d/%Y'
 
-            if driver.find_elements(By.CLASS_NAME, "attSearchRes"):
-                if "returned no results" in driver.find_element(By.CLASS_NAME, "attSearchRes").text:
-                    log_func(f"    -> STATUS: Not Found on website.")
-                    current_result['status'] = 'Not Found'
-                    output_data.append(current_result)
-                    continue
+    def search_terms(self, first_name, last_name):
+        return (f"{first_name} {last_name}".strip(),)
+
+    def search_http(self, search_name):
+        """
+        Runs a QuickSearch. Returns {'found': False} when the site reports no
+        results, otherwise {'found': True, 'rows': [[profile_url, admit_month_text], ...]}.
+        """
+        page_url, soup = fetch_page(BASE_URL, params={'FreeText': search_name})
+
+        no_results = soup.find(class_='attSearchRes')
+        if no_results and "returned no results" in no_results.get_text():
+            return {'found': False}
+
+        results_table = soup.find(id='tblAttorney')
+        if results_table is None or results_table.find('tbody') is None:
+            raise PageParseError("search results table not found")
+
+        rows = []
+        for profile_row in results_table.find('tbody').find_all('tr'):
+            cells = profile_row.find_all('td')
+            link = cells[0].find('a', href=True) if cells else None
+            if len(cells) >= 5 and link:
+                rows.append([urljoin(page_url, link['href']), cells[4].get_text(strip=True)])
+        return {'found': True, 'rows': rows}
+
+    def read_profile_http(self, profile_url, admit_date_to_find=None):
+        """Extracts the admit date, license status and current discipline from a CalBar profile."""
+        _, soup = fetch_page(profile_url)
 
-            candidate_urls = []
-            results_table = driver.find_element(By.ID, "tblAttorney")
-            for profile_row in results_table.find_element(By.TAG_NAME, 'tbody').find_elements(By.TAG_NAME, 'tr'):
-                cells = profile_row.find_elements(By.TAG_NAME, 'td')
-                if len(cells) >= 5:
-                    table_date_str = cells[4].text.strip()
-                    try:
-                        table_date_obj = datetime.strptime(table_date_str, '%B %Y')
-                        if table_date_obj.year == input_admit_date_obj.year and table_date_obj.month == input_admit_date_obj.month:
-                            candidate_urls.append(cells[0].find_element(By.TAG_NAME, 'a').get_attribute('href'))
-                    except (ValueError, NoSuchElementException):
-                        continue
-            
-            log_func(f"    -> Found {len(candidate_urls)} potential profile(s) for admit month/year {input_admit_date_obj.strftime('%B %Y')}.")
-
-            match_found = False
-            unmatched_links = []
-            for i, profile_url in enumerate(candidate_urls):
-                log_func(f"      -> [Candidate {i+1}/{len(candidate_urls)}] Verifying profile: {profile_url}")
-                unmatched_links.append(profile_url)
-                driver.get(profile_url)
+        admitted_cell = soup.find(lambda tag: tag.name == 'td' and 'Admitted to the State Bar of California' in tag.get_text())
+        history_table = admitted_cell.find_parent('table') if admitted_cell else None
+        status_label = soup.find(lambda tag: tag.name == 'b' and 'License Status:' in tag.get_text())
+        if history_table is None or status_label is None:
+            raise PageParseError(f"details table not found on profile {profile_url}")
+
+        admit_date = ''
+        for tr in history_table.find_all('tr'):
+            if "Admitted to the State Bar of California" in tr.get_text():
+                first_cell = tr.find('td')
+                admit_date = first_cell.get_text(strip=True) if first_cell else ''
+                break
+
+        discipline = ''
+        for tr in history_table.find_all('tr'):
+            cells = tr.find_all('td')
+            if any(strong.get_text(strip=True) == 'Present' for cell in cells for strong in cell.find_all('strong')):
+                discipline = cells[2].get_text(strip=True) if len(cells) > 2 else ''
+                break
+
+        return {
+            'admit_date': admit_date,
+            'status': label_value(status_label.parent, 'License Status:'),
+            'discipline': discipline or "No discipline found",
+        }
+
+    def search_selenium(self, driver, wait, search_name):
+        """
+        Browser version of search_http, with the same return shape. It opens
+        the results URL directly rather than filling in the search form, which
+        saves a page load.
+        """
+        driver.get(f"{BASE_URL}?{urlencode({'FreeText': search_name})}")
+        wait.until(EC.any_of(EC.presence_of_element_located((By.ID, "tblAttorney")), EC.presence_of_element_located((By.CLASS_NAME, "attSearchRes"))))
+
+        if driver.find_elements(By.CLASS_NAME, "attSearchRes"):
+            if "returned no results" in driver.find_element(By.CLASS_NAME, "attSearchRes").text:
+                return {'found': False}
+
+        rows = []
+        results_table = driver.find_element(By.ID, "tblAttorney")
+        for profile_row in results_table.find_element(By.TAG_NAME, 'tbody').find_elements(By.TAG_NAME, 'tr'):
+            cells = profile_row.find_elements(By.TAG_NAME, 'td')
+            if len(cells) >= 5:
                 try:
-                    history_table = wait.until(EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Admitted to the State Bar of California')]/ancestor::table")))
-                    is_exact_match = False
-                    for tr in history_table.find_elements(By.TAG_NAME, 'tr'):
-                        if "Admitted to the State Bar of California" in tr.text:
-                            extracted_date_str = tr.find_element(By.TAG_NAME, 'td').text.strip()
-                            log_func(f"        - Comparing website date '{extracted_date_str}' with input date '{admit_date_to_find}'")
-                            if extracted_date_str == admit_date_to_find:
-                                is_exact_match = True
-                                break
-                    if is_exact_match:
-                        log_func(f"        -> EXACT MATCH FOUND! Extracting details...")
-                        status = driver.find_element(By.XPATH, "//b[contains(text(), 'License Status:')]/..").text.replace('License Status:', '').strip()
-                        log_func(f"        - Status: {status}")
-                        discipline_cell = history_table.find_element(By.XPATH, ".//tr[td[strong[text()='Present']]]").find_elements(By.TAG_NAME, 'td')[2]
-                        discipline = discipline_cell.text.strip() if discipline_cell.text.strip() else "No discipline found"
-                        log_func(f"        - Discipline: {discipline}")
-                        current_result.update({'status': status, 'discipline': discipline, 'profile links': profile_url})
-                        match_found = True
-                        break
-                except (TimeoutException, NoSuchElementException):
-                    log_func(f"      -> ERROR: Could not find details table on profile {profile_url}")
+                    rows.append([cells[0].find_element(By.TAG_NAME, 'a').get_attribute('href'), cells[4].text.strip()])
+                except NoSuchElementException:
                     continue
-            
-            if not match_found:
-                 log_func("    -> STATUS: Verification Failed. No profile with an exact date match was found.")
-                 current_result['status'] = "Verification Failed"
-            
-            current_result['unmatched profile links'] = ", ".join(unmatched_links)
-            output_data.append(current_result)
-
-        except Exception as e:
-            log_func(f"    -> An unexpected error occurred: {e}")
-            current_result['status'] = 'Processing Error'
-            output_data.append(current_result)
-        finally:
-            if driver:
-                driver.quit()
-    
-    return pd.DataFrame(output_data)
\ No newline at end of file
+        return {'found': True, 'rows': rows}
+
+    def read_profile_selenium(self, driver, wait, profile_url, admit_date_to_find):
+        """
+        Browser version of read_profile_http. Status and discipline are only
+        read when the admit date matches.
+        """
+        driver.get(profile_url)
+        history_table = wait.until(EC.presence_of_element_located((By.XPATH, "//td[contains(text(), 'Admitted to the State Bar of California')]/ancestor::table")))
+        profile = {'admit_date': ''}
+        for tr in history_table.find_elements(By.TAG_NAME, 'tr'):
+            if "Admitted to the State Bar of California" in tr.text:
+                profile['admit_date'] = tr.find_element(By.TAG_NAME, 'td').text.strip()
+                break
+        if profile['admit_date'] == admit_date_to_find:
+            profile['status'] = driver.find_element(By.XPATH, "//b[contains(text(), 'License Status:')]/..").text.replace('License Status:', '').strip()
+            discipline_cell = history_table.find_element(By.XPATH, ".//tr[td[strong[text()='Present']]]").find_elements(By.TAG_NAME, 'td')[2]
+            profile['discipline'] = discipline_cell.text.strip() if discipline_cell.text.strip() else "No discipline found"
+        return profile
+
+    def select_candidates(self, outcome, row):
+        """Only the search results admitted in the same month and year as the input."""
+        input_admit_date = row['admit date parsed']
+        candidate_urls = []
+        for profile_url, table_date_str in outcome['rows']:
+            try:
+                table_date_obj = datetime.strptime(table_date_str, '%B %Y')
+            except ValueError:
+                continue
+            if table_date_obj.year == input_admit_date.year and table_date_obj.month == input_admit_date.month:
+                candidate_urls.append(profile_url)
+        return candidate_urls
+
+    def describe_candidates(self, row):
+        return f" for admit month/year {row['admit date parsed'].strftime('%B %Y')}"
@@ -0,0 +1,200 @@
+# backend/driver_pool.py
+
+import os
+import queue
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+from webdriver_manager.chrome import ChromeDriverManager
+from metrics import span
+
+# Number of warm Chrome sessions kept per worker process, and how many records
+# a single session may serve before it is torn down and replaced.
+POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '2'))
+MAX_USES_PER_SESSION = int(os.getenv('DRIVER_MAX_USES', '50'))
+
+# Page-load profile. 'eager' makes driver.get() return once the DOM is ready
+# instead of after every subresource has loaded; the verifiers wait for the
+# elements they read themselves.
+PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'eager')
+# Resource types Chrome never fetches, since the verifiers only read text.
+BLOCKED_RESOURCES = [name.strip() for name in os.getenv('BLOCKED_RESOURCES', 'images,fonts,media,stylesheets,trackers').split(',') if name.strip()]
+BLOCKED_URL_PATTERNS = {
+    'images': ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico'],
+    'fonts': ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot'],
+    'media': ['*.mp4', '*.webm', '*.mp3', '*.m4a'],
+    'stylesheets': ['*.css'],
+    'trackers': [
+        '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*',
+        '*facebook.net*', '*hotjar.com*', '*clarity.ms*', '*addthis.com*',
+    ],
+}
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+def get_driver_path():
+    """
+    Resolves the chromedriver binary once per worker process instead of
+    calling ChromeDriverManager().install() for every record.
+    """
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+def build_chrome_options():
+    options = webdriver.ChromeOptions()
+    options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    options.add_argument("--headless")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--single-process")
+    options.page_load_strategy = PAGE_LOAD_STRATEGY
+    if 'images' in BLOCKED_RESOURCES:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+    return options
+
+def block_resources(driver):
+    """Tells a new session to drop requests for the BLOCKED_RESOURCES types."""
+    patterns = [pattern for name in BLOCKED_RESOURCES for pattern in BLOCKED_URL_PATTERNS.get(name, [])]
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except WebDriverException:
+        # Not a Chromium session; pages just load in full.
+        pass
+
+class DriverPool:
+    """
+    A small pool of warm headless Chrome sessions shared by the scrapers.
+    Sessions are reset between records and recycled after MAX_USES_PER_SESSION
+    checkouts, or immediately if they crash.
+    """
+
+    def __init__(self, size=POOL_SIZE, max_uses=MAX_USES_PER_SESSION):
+        self.size = size
+        self.max_uses = max_uses
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._stats = {'sessions_created': 0, 'reuses': 0, 'recycled': 0, 'checkouts': 0, 'total_wait_seconds': 0.0}
+
+    def _create_driver(self):
+        with span('driver_start'):
+            service = Service(get_driver_path())
+            driver = webdriver.Chrome(service=service, options=build_chrome_options())
+            block_resources(driver)
+        with self._lock:
+            self._uses[id(driver)] = 0
+            self._stats['sessions_created'] += 1
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _reset(self, driver):
+        """Clears cookies and storage and parks the session on about:blank."""
+        try:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except WebDriverException:
+            # Storage is not accessible on some pages (e.g. about:blank); that's fine.
+            pass
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def checkout(self):
+        started = time.monotonic()
+        self._slots.acquire()
+        try:
+            try:
+                driver = self._idle.get_nowait()
+                reused = True
+            except queue.Empty:
+                driver = self._create_driver()
+                reused = False
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_seconds'] += time.monotonic() - started
+            if reused:
+                self._stats['reuses'] += 1
+        return driver
+
+    def release(self, driver):
+        """
+        Returns a session to the pool. A session that fails to reset is treated
+        as crashed and replaced on the next checkout.
+        """
+        try:
+            with self._lock:
+                worn_out = self._uses.get(id(driver), 0) >= self.max_uses
+            if worn_out:
+                with self._lock:
+                    self._stats['recycled'] += 1
+                self._discard(driver)
+                return
+            try:
+                self._reset(driver)
+            except Exception:
+                with self._lock:
+                    self._stats['recycled'] += 1
+                self._discard(driver)
+                return
+            self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['avg_checkout_wait_seconds'] = round(stats['total_wait_seconds'] / stats['checkouts'], 4) if stats['checkouts'] else 0.0
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 4)
+        return stats
+
+    def shutdown(self):
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_driver_pool(size=None):
+    """
+    Returns the pool for this worker process, creating it on first use.
+    `size` only applies when the pool is created.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(size=size or POOL_SIZE)
+    return _pool
+
+def shutdown_driver_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
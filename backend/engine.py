@@ -0,0 +1,423 @@
+# backend/engine.py
+
+import os
+import threading
+from abc import ABC, abstractmethod
+import time
+from selenium.webdriver.support.ui import WebDriverWait
+from urllib.parse import urlparse
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, WebDriverException
+from requests import HTTPError, RequestException, Timeout
+from ai_utils import clean_name_with_gemini
+from http_lookup import EmptyPageError, PageParseError, http_engine_enabled
+from job_cache import JobCache, search_key
+from normalize import DROPPED, PROFILE_ERRORS, input_result, new_result
+from metrics import span
+from rate_limiter import RETRY_ATTEMPTS, backoff_delay, get_circuit_breaker, get_rate_limiter
+
+# How often browser waits re-check their condition (WebDriverWait's default is 0.5s).
+WAIT_POLL_SECONDS = float(os.getenv('WAIT_POLL_SECONDS', '0.1'))
+
+_TEXTS_SCRIPT = """
+return arguments[0].map(function (xpath) {
+    var node = document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return node ? node.innerText : null;
+});
+"""
+
+def wait_for_texts(wait, xpaths, placeholder=None):
+    """
+    Waits until every element in `xpaths` is on the page (and, with a
+    `placeholder` such as "Loading...", no longer shows it), then returns
+    their texts. All elements are read in one script call per poll.
+    """
+    def loaded(driver):
+        texts = driver.execute_script(_TEXTS_SCRIPT, xpaths)
+        if all(text is not None and not (placeholder and placeholder in text) for text in texts):
+            return texts
+        return False
+    return wait.until(loaded)
+
+def is_throttle_signal(error):
+    """Whether an error suggests the site wants us to slow down: a 429/503, a timeout or an empty page."""
+    if isinstance(error, HTTPError):
+        return error.response is not None and error.response.status_code in (429, 503)
+    return isinstance(error, (Timeout, TimeoutException, EmptyPageError))
+
+def is_transient(error):
+    """Whether a failed lookup is worth retrying: network and browser trouble or an empty page, not a page that lacks what we look for."""
+    if isinstance(error, (NoSuchElementException, StaleElementReferenceException)):
+        return False
+    return isinstance(error, (RequestException, WebDriverException, EmptyPageError))
+
+class PageTimings:
+    """Per-job totals of where browser records spend their time, shared by worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {'records': 0, 'record_seconds': 0.0, 'checkout_seconds': 0.0, 'navigation_seconds': 0.0, 'wait_seconds': 0.0, 'navigations': 0, 'waits': 0}
+
+    def add(self, record_timings):
+        with self._lock:
+            self._totals['records'] += 1
+            for key, value in record_timings.items():
+                self._totals[key] += value
+
+    def get_stats(self):
+        with self._lock:
+            return {key: round(value, 4) for key, value in self._totals.items()}
+
+class _TimedDriver:
+    """Wraps a WebDriver so the time spent in driver.get() is counted as navigation."""
+
+    def __init__(self, driver, timings):
+        self._driver = driver
+        self._timings = timings
+
+    def get(self, url):
+        started = time.monotonic()
+        try:
+            return self._driver.get(url)
+        finally:
+            self._timings['navigation_seconds'] += time.monotonic() - started
+            self._timings['navigations'] += 1
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+class _TimedWait(WebDriverWait):
+    """A WebDriverWait that counts the time spent in until() as waiting."""
+
+    def __init__(self, driver, timeout, timings):
+        super().__init__(driver, timeout, poll_frequency=WAIT_POLL_SECONDS)
+        self._timings = timings
+
+    def until(self, method, message=''):
+        started = time.monotonic()
+        try:
+            return super().until(method, message)
+        finally:
+            self._timings['wait_seconds'] += time.monotonic() - started
+            self._timings['waits'] += 1
+
+class StateVerifier(ABC):
+    """
+    A state bar plugin. Subclasses describe only what is specific to their
+    site: how to search it, which search results are worth opening, and how
+    to read a profile, plus a few input rules and statuses. Everything else
+    is done by verify_record, the same way for every state.
+
+    Search functions return {'found': False} or {'found': True, ...}; profile
+    readers return {'admit_date': ...} plus 'status' and 'discipline' when
+    the admit date matches. The *_http versions are optional; a plugin
+    without the browser versions can't be instantiated, so it fails when it
+    is listed in verifiers.VERIFIERS.
+    """
+    name = None
+    label = None
+    # Seconds the browser waits for the data on a page.
+    wait_timeout = 15
+
+    # Input rules, applied by normalize.normalize_records. date_format None
+    # accepts any date pandas can parse; DROPPED rows produce no result.
+    date_format = None
+    require_both_names = False
+    missing_name_status = 'Missing Input Data'
+    missing_date_status = 'Missing Input Data'
+    invalid_date_status = 'Invalid Input Date Format'
+
+    no_match_status = 'Verification Failed'
+    no_match_message = 'Verification Failed. No profile with an exact date match was found.'
+    # Errors that mean one profile couldn't be read; the next candidate is tried.
+    profile_errors = (TimeoutException, NoSuchElementException, IndexError)
+
+    # The site's search page; its host is what the rate limiter is keyed on.
+    base_url = None
+    search_http = None
+    read_profile_http = None
+
+    @property
+    def host(self):
+        return urlparse(self.base_url).netloc
+
+    @property
+    def max_workers(self):
+        """The most browsers allowed to work this site at once."""
+        return int(os.getenv(f"{self.name.upper()}_MAX_WORKERS", '3'))
+
+    @property
+    def max_rate(self):
+        """
+        The most page requests per second sent to this site across all
+        workers, set as the minimum spacing between two requests.
+        """
+        min_interval = float(os.getenv(f"{self.name.upper()}_MIN_INTERVAL", '0.5'))
+        return 1 / min_interval if min_interval > 0 else 100.0
+
+    def admit_date_keys(self, admit_dates, parsed):
+        """The admit date column as compared with profile pages; by default as entered."""
+        return admit_dates
+
+    def search_terms(self, first_name, last_name):
+        return (first_name, last_name)
+
+    @abstractmethod
+    def search_selenium(self, driver, wait, *terms):
+        pass
+
+    @abstractmethod
+    def read_profile_selenium(self, driver, wait, url, admit_date_key):
+        pass
+
+    def select_candidates(self, outcome, row):
+        """The profile URLs from a search outcome worth opening; by default all of them."""
+        return outcome['urls']
+
+    def describe_candidates(self, row):
+        return ""
+
+def match_record(verifier, row, terms, current_result, log_func, job_cache, search, read_profile):
+    """
+    Runs the search/candidate/profile flow with the given engine functions,
+    reusing searches and profiles already fetched earlier in the job.
+    Returns an updated copy of `current_result`.
+    """
+    result = dict(current_result)
+    admit_date_key = row['admit date key']
+    log_func(f"    -> Navigating and searching for '{' '.join(terms)}'...")
+    outcome = job_cache.searches.get_or_load(search_key(verifier.name, *terms), lambda: search(*terms))
+
+    if not outcome['found']:
+        log_func("    -> STATUS: Not Found on website.")
+        result['status'] = 'Not Found'
+        return result
+
+    candidate_urls = verifier.select_candidates(outcome, row)
+    log_func(f"    -> Found {len(candidate_urls)} potential profile(s){verifier.describe_candidates(row)}.")
+
+    unmatched_links = []
+    for i, url in enumerate(candidate_urls):
+        log_func(f"      -> [Candidate {i+1}/{len(candidate_urls)}] Verifying profile: {url}")
+        try:
+            # A cached profile read for a different admit date may lack status/discipline.
+            profile = job_cache.profiles.get_or_load(
+                url, lambda: read_profile(url, admit_date_key),
+                usable=lambda cached: 'status' in cached or cached['admit_date'] != admit_date_key,
+            )
+        except verifier.profile_errors as e:
+            log_func(f"      -> ERROR: Could not find details on profile {url}. Error: {e}")
+            result[PROFILE_ERRORS] = result.get(PROFILE_ERRORS, 0) + 1
+            unmatched_links.append(url)
+            continue
+
+        log_func(f"        - Comparing website date '{profile['admit_date']}' with input date '{admit_date_key}'")
+        if profile['admit_date'] == admit_date_key:
+            log_func("        -> EXACT MATCH FOUND! Extracting details...")
+            log_func(f"        - Status: {profile['status']}")
+            log_func(f"        - Discipline: {profile['discipline']}")
+            result.update({'status': profile['status'], 'discipline': profile['discipline'], 'profile links': url})
+            result['unmatched profile links'] = ", ".join(unmatched_links)
+            return result
+        unmatched_links.append(url)
+
+    log_func(f"    -> STATUS: {verifier.no_match_message}")
+    result.update({'status': verifier.no_match_status, 'unmatched profile links': ", ".join(unmatched_links)})
+    return result
+
+def _site_request(limiter, stage, fetch):
+    """
+    Wraps a page fetch so it waits for the site's rate limiter, reports back
+    to it, and is timed as `stage`.
+    """
+    def limited_fetch(*args):
+        limiter.acquire()
+        try:
+            with span(stage):
+                page = fetch(*args)
+        except Exception as e:
+            if is_throttle_signal(e):
+                limiter.record_throttled()
+            raise
+        limiter.record_success()
+        return page
+    return limited_fetch
+
+class _LazyBrowser:
+    """
+    A browser for one lookup attempt, checked out of the pool only when the
+    record first needs one. The time from checkout to release is the record's
+    browser time.
+    """
+
+    def __init__(self, verifier, pool, record_timings):
+        self._verifier = verifier
+        self._pool = pool
+        self._timings = record_timings
+        self._driver = None
+        self._session = None
+
+    def _checkout(self):
+        if self._session is None:
+            self._started = time.monotonic()
+            with span('driver_checkout'):
+                self._driver = self._pool.checkout()
+            self._timings['checkout_seconds'] += time.monotonic() - self._started
+            timed_driver = _TimedDriver(self._driver, self._timings)
+            self._session = (timed_driver, _TimedWait(timed_driver, self._verifier.wait_timeout, self._timings))
+        return self._session
+
+    def search(self, *search_terms):
+        return self._verifier.search_selenium(*self._checkout(), *search_terms)
+
+    def read_profile(self, url, admit_date_key):
+        return self._verifier.read_profile_selenium(*self._checkout(), url, admit_date_key)
+
+    def release(self):
+        if self._driver is not None:
+            self._timings['record_seconds'] += time.monotonic() - self._started
+            self._pool.release(self._driver)
+            self._driver = self._session = None
+
+def _lookup(verifier, row, terms, current_result, log_func, job_cache, pool, limiter, record_timings):
+    """
+    One lookup attempt: over plain HTTP when the plugin supports it,
+    otherwise or when a page can't be parsed in a browser. Once a state's
+    search or profile pages fail to parse over HTTP, later records of the job
+    read that kind of page in the browser straight away. Throttling and
+    network errors are raised for the caller to retry, not retried at once
+    in a browser.
+    """
+    # Only take a browser once we know the row needs one.
+    browser = _LazyBrowser(verifier, pool, record_timings)
+    try:
+        if http_engine_enabled() and verifier.search_http and verifier.read_profile_http and job_cache.http_search_works(verifier.name):
+            fetch_search = _site_request(limiter, 'search', verifier.search_http)
+            def search(*search_terms):
+                try:
+                    return fetch_search(*search_terms)
+                except EmptyPageError:
+                    raise
+                except PageParseError:
+                    # The page layout won't change within the job; stop paying for an HTTP search first.
+                    if job_cache.mark_http_search_failed(verifier.name):
+                        log_func(f"    -> [HTTP] {verifier.label} search results can't be read over HTTP; the rest of this job searches in the browser.")
+                    raise
+
+            if job_cache.http_profile_works(verifier.name):
+                fetch_profile = _site_request(limiter, 'profile', verifier.read_profile_http)
+                def read_profile(url, admit_date_key):
+                    try:
+                        return fetch_profile(url, admit_date_key)
+                    except EmptyPageError:
+                        raise
+                    except PageParseError:
+                        # Same for profiles, e.g. pages that load their details by script.
+                        if job_cache.mark_http_profile_failed(verifier.name):
+                            log_func(f"    -> [HTTP] {verifier.label} profiles can't be read over HTTP; the rest of this job reads them in the browser.")
+                        raise
+            else:
+                read_profile = _site_request(limiter, 'profile', browser.read_profile)
+
+            try:
+                return match_record(verifier, row, terms, current_result, log_func, job_cache, search, read_profile)
+            except EmptyPageError:
+                raise
+            except PageParseError as e:
+                log_func(f"    -> [HTTP] Could not read the page ({e}). Falling back to the browser.")
+
+        return match_record(
+            verifier, row, terms, current_result, log_func, job_cache,
+            _site_request(limiter, 'search', browser.search),
+            _site_request(limiter, 'profile', browser.read_profile),
+        )
+    finally:
+        browser.release()
+
+def verify_record(verifier, index, row, gemini_api_key, log_func, pool, name_cleaning=None, job_cache=None, page_timings=None):
+    with span('record'):
+        return _verify_record(verifier, index, row, gemini_api_key, log_func, pool, name_cleaning, job_cache, page_timings)
+
+def _verify_record(verifier, index, row, gemini_api_key, log_func, pool, name_cleaning, job_cache, page_timings):
+    """
+    Verifies a single normalized roster row (see normalize.normalize_records)
+    against the verifier's site. `name_cleaning` is an already computed
+    (success, result) pair from a batched cleaning pass; without it the name
+    is cleaned here. `job_cache` shares searches and profile pages between
+    the records of a job. Pages are read over plain HTTP when the plugin
+    supports it, and in a browser from `pool` otherwise or on failure; for
+    browser records the time spent getting a browser, navigating and waiting
+    for page data is logged and added to `page_timings`.
+
+    Every page request goes through the site's shared rate limiter. Lookups
+    that fail with a transient error are retried with jittered backoff, and
+    repeated failures open the site's circuit breaker.
+
+    Returns the result dict, or None if the row should be dropped.
+    """
+    if row['input status']:
+        return input_result(index, row, verifier.name, log_func)
+
+    raw_first_name = row['first name']
+    last_name = row['last name']
+
+    log_func(f"\n  [Record {index+1}] Processing: '{raw_first_name} {last_name}'")
+    current_result = new_result(row, verifier.name)
+    job_cache = job_cache or JobCache()
+
+    record_timings = {'record_seconds': 0.0, 'checkout_seconds': 0.0, 'navigation_seconds': 0.0, 'wait_seconds': 0.0, 'navigations': 0, 'waits': 0}
+    try:
+        if name_cleaning is None:
+            with span('ai_clean'):
+                name_cleaning = clean_name_with_gemini(raw_first_name, last_name, gemini_api_key)
+        success, result = name_cleaning
+        if success:
+            log_func(f"    -> AI cleaned '{raw_first_name}' to '{result}'.")
+            first_name = result
+        else:
+            log_func(f"    -> WARNING: {result}. Using basic cleaning.")
+            first_name = row['fallback first name']
+
+        has_names = (first_name and last_name) if verifier.require_both_names else (first_name or last_name)
+        if not has_names:
+            log_func("    -> SKIPPED: Missing name after cleaning.")
+            if verifier.missing_name_status == DROPPED:
+                return None
+            current_result['status'] = verifier.missing_name_status
+            return current_result
+
+        terms = verifier.search_terms(first_name, last_name)
+        limiter = get_rate_limiter(verifier.host, verifier.max_rate)
+        breaker = get_circuit_breaker(verifier.name)
+        attempts = max(1, RETRY_ATTEMPTS)
+        for attempt in range(attempts):
+            try:
+                result = _lookup(verifier, row, terms, current_result, log_func, job_cache, pool, limiter, record_timings)
+            except Exception as e:
+                if not is_transient(e):
+                    raise
+                if breaker.record_failure():
+                    log_func(f"    -> [Circuit] {verifier.label} keeps failing; pausing it for {breaker.cooldown}s.")
+                if attempt + 1 == attempts:
+                    raise
+                delay = backoff_delay(attempt)
+                log_func(f"    -> [Retry {attempt+1}/{attempts-1}] {type(e).__name__}: {e}. Trying again in {delay:.1f}s.")
+                time.sleep(delay)
+                breaker.wait_until_closed()
+                continue
+            breaker.record_success()
+            return result
+
+    except Exception as e:
+        log_func(f"    -> An unexpected error occurred: {e}")
+        current_result['status'] = 'Processing Error'
+        return current_result
+    finally:
+        if record_timings['record_seconds']:
+            log_func(
+                f"    -> [Timing] {record_timings['record_seconds']:.2f}s in the browser: "
+                f"{record_timings['checkout_seconds']:.2f}s getting a session, "
+                f"{record_timings['navigation_seconds']:.2f}s loading {record_timings['navigations']} page(s), "
+                f"{record_timings['wait_seconds']:.2f}s waiting for page data."
+            )
+            if page_timings is not None:
+                page_timings.add(record_timings)
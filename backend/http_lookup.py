@@ -0,0 +1,52 @@
+# backend/http_lookup.py
+
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
+
+# 'auto' tries plain HTTP first and falls back to Selenium when a page can't be
+# parsed; 'selenium' always drives the browser.
+SCRAPER_ENGINE = os.getenv('SCRAPER_ENGINE', 'auto')
+HTTP_TIMEOUT = float(os.getenv('HTTP_LOOKUP_TIMEOUT', '15'))
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml',
+}
+
+class PageParseError(Exception):
+    """Raised when a page doesn't have the structure the HTTP parser expects."""
+
+class EmptyPageError(PageParseError):
+    """Raised when the site answers with an empty page, often a sign of throttling."""
+
+_local = threading.local()
+
+def http_engine_enabled():
+    return SCRAPER_ENGINE != 'selenium'
+
+def get_http_session():
+    """Returns this thread's keep-alive session, creating it on first use."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+def fetch_page(url, params=None):
+    """GETs a page on this thread's session; returns (final_url, soup)."""
+    response = get_http_session().get(url, params=params, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    if not response.text.strip():
+        raise EmptyPageError(f"empty response from {response.url}")
+    return response.url, BeautifulSoup(response.text, 'html.parser')
+
+def label_value(element, label):
+    """Returns an element's text with its leading label (e.g. 'Status') removed."""
+    return element.get_text(' ', strip=True).replace(label, '', 1).strip()
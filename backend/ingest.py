@@ -0,0 +1,107 @@
+# backend/ingest.py
+
+import os
+import msgpack
+import pandas as pd
+from normalize import parse_admit_dates
+from verifiers import VERIFIERS
+
+REQUIRED_FIELDS = ['first name', 'last name', 'admit date']
+# Rows are read, validated and stored this many at a time, so memory stays
+# bounded however large the upload is.
+INGEST_CHUNK_ROWS = int(os.getenv('INGEST_CHUNK_ROWS', '500'))
+INPUT_TTL = int(os.getenv('RESULTS_TTL', str(7 * 24 * 3600)))
+MAX_REPORTED_ERRORS = 50
+
+class IngestError(ValueError):
+    """Raised when an upload can't be used at all (e.g. a mapped column is missing)."""
+
+def _input_key(upload_id):
+    return f"input:{upload_id}"
+
+def _row_errors(chunk, state):
+    """Returns a list of error messages for each row of a normalized chunk."""
+    parsed = parse_admit_dates(chunk['admit date'], VERIFIERS[state].date_format)
+    errors = [[] for _ in range(len(chunk))]
+    for field in REQUIRED_FIELDS:
+        for position in (chunk[field] == '').to_numpy().nonzero()[0]:
+            errors[position].append(f"missing {field}")
+    bad_dates = (parsed.isna() & (chunk['admit date'] != '')).to_numpy().nonzero()[0]
+    for position in bad_dates:
+        errors[position].append(f"invalid admit date '{chunk['admit date'].iat[position]}'")
+    return errors
+
+def ingest_upload(redis_conn, file_stream, column_mapping, state, upload_id):
+    """
+    Streams an uploaded CSV into Redis as compact msgpack chunks of
+    INGEST_CHUNK_ROWS [first name, last name, admit date] rows, reading only
+    the mapped columns as strings.
+
+    Returns (input_ref, summary) where `input_ref` is what jobs receive instead
+    of the data itself, and `summary` holds the row count and the first
+    MAX_REPORTED_ERRORS row-level validation errors (CSV line numbers).
+    Raises IngestError if the mapping doesn't match the file.
+    """
+    if state not in VERIFIERS:
+        raise IngestError("Invalid state provided")
+    missing = [field for field in REQUIRED_FIELDS if not column_mapping.get(field)]
+    if missing:
+        raise IngestError(f"Column mapping is missing: {', '.join(missing)}")
+    source_columns = [column_mapping[field] for field in REQUIRED_FIELDS]
+    rename_map = {column_mapping[field]: field for field in REQUIRED_FIELDS}
+
+    try:
+        reader = pd.read_csv(
+            file_stream, usecols=source_columns, dtype=str, keep_default_na=False,
+            chunksize=INGEST_CHUNK_ROWS, encoding='utf-8', skipinitialspace=True,
+        )
+        key = _input_key(upload_id)
+        total_rows = 0
+        invalid_rows = 0
+        row_errors = []
+        for chunk in reader:
+            chunk = chunk.rename(columns=rename_map)[REQUIRED_FIELDS].apply(lambda column: column.str.strip())
+            for position, errors in enumerate(_row_errors(chunk, state)):
+                if errors:
+                    invalid_rows += 1
+                    if len(row_errors) < MAX_REPORTED_ERRORS:
+                        # +2: one for the header line, one because CSV lines are 1-based.
+                        row_errors.append({"row": total_rows + position + 2, "errors": errors})
+            redis_conn.rpush(key, msgpack.packb(chunk.to_numpy().tolist()))
+            total_rows += len(chunk)
+    except ValueError as e:
+        # pandas reports unknown usecols as a ValueError.
+        redis_conn.delete(_input_key(upload_id))
+        raise IngestError(f"Could not read the CSV with the given column mapping: {e}")
+
+    redis_conn.expire(key, INPUT_TTL)
+    input_ref = {'key': key, 'chunk_rows': INGEST_CHUNK_ROWS, 'start': 0, 'stop': total_rows}
+    summary = {'total_rows': total_rows, 'invalid_rows': invalid_rows, 'row_errors': row_errors}
+    return input_ref, summary
+
+def delete_input(redis_conn, input_ref):
+    """Drops a stored upload that won't be used, e.g. one with no valid rows."""
+    redis_conn.delete(input_ref['key'])
+
+def slice_input_ref(input_ref, start, stop):
+    """A reference to rows [start, stop) of the same stored upload."""
+    return dict(input_ref, start=start, stop=stop)
+
+def load_records(redis_conn, input_ref):
+    """
+    Loads the rows an input reference points to as a DataFrame indexed by
+    input row number, fetching only the msgpack chunks that cover them.
+    """
+    chunk_rows = input_ref['chunk_rows']
+    start, stop = input_ref['start'], input_ref['stop']
+    if stop <= start:
+        return pd.DataFrame(columns=REQUIRED_FIELDS)
+    first_chunk, last_chunk = start // chunk_rows, (stop - 1) // chunk_rows
+    blobs = redis_conn.lrange(input_ref['key'], first_chunk, last_chunk)
+    if len(blobs) != last_chunk - first_chunk + 1:
+        raise ValueError(f"Stored input {input_ref['key']} has expired or is incomplete")
+
+    rows = [row for blob in blobs for row in msgpack.unpackb(blob)]
+    skip = start - first_chunk * chunk_rows
+    rows = rows[skip:skip + (stop - start)]
+    return pd.DataFrame(rows, columns=REQUIRED_FIELDS, index=pd.RangeIndex(start, stop))
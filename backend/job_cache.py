@@ -0,0 +1,106 @@
+# backend/job_cache.py
+
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on entries per in-job index, so huge rosters can't exhaust memory.
+JOB_CACHE_MAX_ENTRIES = int(os.getenv('JOB_CACHE_MAX_ENTRIES', '5000'))
+_LOCK_STRIPES = 64
+
+class LRUCache:
+    """A thread-safe, size-bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, max_entries=JOB_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        # Striped per-key locks make concurrent loads of the same key wait for
+        # the first one instead of fetching the page twice.
+        self._key_locks = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, usable=None):
+        """
+        Returns the cached value for `key`, calling `loader()` only if there is
+        none or `usable(value)` rejects it. Values of None are not cached.
+        """
+        with self._key_locks[hash(key) % _LOCK_STRIPES]:
+            value = self.get(key)
+            if value is not None and (usable is None or usable(value)):
+                with self._lock:
+                    self.hits += 1
+                return value
+            with self._lock:
+                self.misses += 1
+            value = loader()
+            if value is not None:
+                self.put(key, value)
+            return value
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+class JobCache:
+    """
+    Per-job indexes shared by all record workers: parsed profile pages keyed by
+    URL and search outcomes keyed by state and query. It also remembers which
+    states' search and profile pages couldn't be parsed over plain HTTP, so
+    later records of the job read those pages in the browser straight away.
+    """
+
+    def __init__(self, max_entries=JOB_CACHE_MAX_ENTRIES):
+        self.profiles = LRUCache(max_entries)
+        self.searches = LRUCache(max_entries)
+        self._http_search_failed = set()
+        self._http_profile_failed = set()
+        self._lock = threading.Lock()
+
+    def http_search_works(self, state):
+        with self._lock:
+            return state not in self._http_search_failed
+
+    def mark_http_search_failed(self, state):
+        """Returns True if this is the first failure recorded for `state`."""
+        return self._mark_failed(self._http_search_failed, state)
+
+    def http_profile_works(self, state):
+        with self._lock:
+            return state not in self._http_profile_failed
+
+    def mark_http_profile_failed(self, state):
+        """Returns True if this is the first failure recorded for `state`."""
+        return self._mark_failed(self._http_profile_failed, state)
+
+    def _mark_failed(self, failed_states, state):
+        with self._lock:
+            if state in failed_states:
+                return False
+            failed_states.add(state)
+            return True
+
+    def get_stats(self):
+        return {
+            'profile_hits': self.profiles.hits, 'profile_fetches': self.profiles.misses,
+            'search_hits': self.searches.hits, 'search_fetches': self.searches.misses,
+        }
+
+def search_key(state, *terms):
+    """Normalises a search query so equivalent searches share one cache entry."""
+    return (state,) + tuple(" ".join(str(term).split()).lower() for term in terms)
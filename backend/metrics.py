@@ -0,0 +1,179 @@
+# backend/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from rq import Worker
+from rq.registry import FailedJobRegistry, StartedJobRegistry
+
+# Upper bounds, in seconds, of the stage latency histogram buckets.
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Stages are timed into this process's histograms (an RQ work horse runs one
+# job, so they describe the current job and end up in its job.meta) and into
+# pending increments that flush_metrics adds to the Redis counters behind
+# /metrics, which cover every worker.
+_lock = threading.Lock()
+_histograms = {}
+_pending = {}
+
+STAGE_KEY_PREFIX = 'metrics:stage:'
+RECORDS_KEY = 'metrics:records'
+JOBS_KEY = 'metrics:jobs'
+
+def _bucket_label(bound):
+    return f"{bound:g}"
+
+def _empty_histogram():
+    return {'count': 0, 'sum': 0.0, 'errors': 0, 'buckets': {_bucket_label(bound): 0 for bound in STAGE_BUCKETS}}
+
+def observe(stage, seconds, error=False):
+    """Records one timing for `stage` (e.g. 'search')."""
+    with _lock:
+        for store in (_histograms, _pending):
+            histogram = store.setdefault(stage, _empty_histogram())
+            histogram['count'] += 1
+            histogram['sum'] += seconds
+            histogram['errors'] += int(error)
+            for bound in STAGE_BUCKETS:
+                if seconds <= bound:
+                    histogram['buckets'][_bucket_label(bound)] += 1
+                    break
+
+@contextmanager
+def span(stage):
+    """Times the enclosed block as one `stage` observation; an exception counts as an error."""
+    started = time.monotonic()
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        observe(stage, time.monotonic() - started, error)
+
+def _percentile(histogram, fraction):
+    """Estimates a percentile as the upper bound of the bucket it falls in."""
+    if not histogram['count']:
+        return None
+    target = fraction * histogram['count']
+    seen = 0
+    for bound in STAGE_BUCKETS:
+        seen += histogram['buckets'][_bucket_label(bound)]
+        if seen >= target:
+            return bound
+    return float('inf')
+
+def summarize_histograms(histograms):
+    """Adds mean/p50/p95 to each stage's histogram for reporting."""
+    summary = {}
+    for stage, histogram in histograms.items():
+        summary[stage] = dict(histogram, buckets=dict(histogram['buckets']))
+        summary[stage]['sum'] = round(histogram['sum'], 4)
+        summary[stage]['mean'] = round(histogram['sum'] / histogram['count'], 4) if histogram['count'] else None
+        summary[stage]['p50'] = _percentile(histogram, 0.5)
+        summary[stage]['p95'] = _percentile(histogram, 0.95)
+    return summary
+
+def reset_stage_histograms():
+    with _lock:
+        _histograms.clear()
+
+def get_stage_histograms():
+    """This process's per-stage histograms, summarized for job.meta."""
+    with _lock:
+        return summarize_histograms(_histograms)
+
+def merge_stage_histograms(histogram_dicts):
+    """Combines several jobs' stage histograms (e.g. the chunks of a sharded job)."""
+    merged = {}
+    for histograms in histogram_dicts:
+        for stage, histogram in (histograms or {}).items():
+            total = merged.setdefault(stage, _empty_histogram())
+            total['count'] += histogram.get('count', 0)
+            total['sum'] += histogram.get('sum', 0.0)
+            total['errors'] += histogram.get('errors', 0)
+            for label, count in histogram.get('buckets', {}).items():
+                total['buckets'][label] = total['buckets'].get(label, 0) + count
+    return summarize_histograms(merged)
+
+def flush_metrics(redis_conn):
+    """Adds the timings recorded since the last flush to the shared Redis counters."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    pipe = redis_conn.pipeline(transaction=False)
+    for stage, histogram in pending.items():
+        key = f"{STAGE_KEY_PREFIX}{stage}"
+        pipe.hincrby(key, 'count', histogram['count'])
+        pipe.hincrbyfloat(key, 'sum', histogram['sum'])
+        pipe.hincrby(key, 'errors', histogram['errors'])
+        for label, count in histogram['buckets'].items():
+            if count:
+                pipe.hincrby(key, f"le:{label}", count)
+    pipe.execute()
+
+def count_records(redis_conn, state, results):
+    """Counts finished records by state and status for /metrics."""
+    pipe = redis_conn.pipeline(transaction=False)
+    for result in results:
+        if result is not None:
+            pipe.hincrby(RECORDS_KEY, f"{state}|{result.get('status') or 'Unknown'}", 1)
+    pipe.execute()
+
+def count_job(redis_conn, state, status):
+    """Counts a job reaching a final status ('finished', 'stopped' or 'failed')."""
+    redis_conn.hincrby(JOBS_KEY, f"{state}|{status}", 1)
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+def render_metrics(redis_conn, queue):
+    """Renders the shared counters and queue state in the Prometheus text format."""
+    lines = []
+
+    lines.append("# HELP verifier_stage_seconds Time spent in each verification stage, across all workers.")
+    lines.append("# TYPE verifier_stage_seconds histogram")
+    stage_keys = sorted(key.decode('utf-8') for key in redis_conn.scan_iter(match=f"{STAGE_KEY_PREFIX}*"))
+    stage_errors = []
+    for key in stage_keys:
+        stage = _label_value(key[len(STAGE_KEY_PREFIX):])
+        fields = {field.decode('utf-8'): value.decode('utf-8') for field, value in redis_conn.hgetall(key).items()}
+        cumulative = 0
+        for bound in STAGE_BUCKETS:
+            cumulative += int(fields.get(f"le:{_bucket_label(bound)}", 0))
+            lines.append(f'verifier_stage_seconds_bucket{{stage="{stage}",le="{_bucket_label(bound)}"}} {cumulative}')
+        lines.append(f'verifier_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {int(fields.get("count", 0))}')
+        lines.append(f'verifier_stage_seconds_sum{{stage="{stage}"}} {float(fields.get("sum", 0))}')
+        lines.append(f'verifier_stage_seconds_count{{stage="{stage}"}} {int(fields.get("count", 0))}')
+        stage_errors.append(f'verifier_stage_errors_total{{stage="{stage}"}} {int(fields.get("errors", 0))}')
+
+    lines.append("# HELP verifier_stage_errors_total Stage runs that ended in an exception.")
+    lines.append("# TYPE verifier_stage_errors_total counter")
+    lines.extend(stage_errors)
+
+    lines.append("# HELP verifier_records_total Records verified, by state and result status.")
+    lines.append("# TYPE verifier_records_total counter")
+    for field, value in sorted(redis_conn.hgetall(RECORDS_KEY).items()):
+        state, status = field.decode('utf-8').split('|', 1)
+        lines.append(f'verifier_records_total{{state="{_label_value(state)}",status="{_label_value(status)}"}} {int(value)}')
+
+    lines.append("# HELP verifier_jobs_total Verification jobs that reached a final status.")
+    lines.append("# TYPE verifier_jobs_total counter")
+    for field, value in sorted(redis_conn.hgetall(JOBS_KEY).items()):
+        state, status = field.decode('utf-8').split('|', 1)
+        lines.append(f'verifier_jobs_total{{state="{_label_value(state)}",status="{_label_value(status)}"}} {int(value)}')
+
+    lines.append("# HELP verifier_queue_jobs Jobs in the RQ queue by registry.")
+    lines.append("# TYPE verifier_queue_jobs gauge")
+    lines.append(f'verifier_queue_jobs{{registry="queued"}} {queue.count}')
+    lines.append(f'verifier_queue_jobs{{registry="started"}} {StartedJobRegistry(queue=queue).count}')
+    lines.append(f'verifier_queue_jobs{{registry="failed"}} {FailedJobRegistry(queue=queue).count}')
+
+    lines.append("# HELP verifier_workers RQ workers connected to Redis.")
+    lines.append("# TYPE verifier_workers gauge")
+    lines.append(f"verifier_workers {Worker.count(connection=redis_conn)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,77 @@
+# backend/normalize.py
+
+import numpy as np
+import pandas as pd
+
+INPUT_COLUMNS = ['first name', 'last name', 'admit date']
+
+# Value of the 'input status' column for rows that produce no result at all.
+DROPPED = 'Dropped'
+
+# Set on a result when some candidate profile couldn't be read, so its status
+# may be wrong; such results are not cached. Keys starting with '_' stay
+# inside the job and are never stored with the results.
+PROFILE_ERRORS = '_profile_errors'
+
+# The input rules come from the state's verifier (see engine.StateVerifier):
+# date_format, admit_date_keys(), require_both_names and the statuses given
+# to rows that can't be looked up.
+
+def parse_admit_dates(admit_dates, date_format=None):
+    """Parses a column of admit date strings at once; invalid or blank dates become NaT."""
+    return pd.to_datetime(admit_dates, format=date_format or 'mixed', errors='coerce')
+
+def basic_clean_first_names(first_names):
+    """The no-AI fallback for a whole column: the first word, letters only."""
+    first_words = first_names.str.split().str[0].fillna('')
+    return first_words.str.replace(r'[\W\d_]+', '', regex=True)
+
+def normalize_records(records_df, verifier):
+    """
+    Normalizes a frame of input rows column by column, before any lookup.
+    Returns a copy with the input columns stripped, plus:
+    - 'fallback first name': the first name to search for if AI cleaning fails
+    - 'admit date parsed': the admit date as a Timestamp (NaT if invalid)
+    - 'admit date key': the admit date as compared with profile pages
+    - 'input status': '' for rows that need a lookup, otherwise the status
+      the row gets without one (or DROPPED)
+    """
+    df = records_df.copy()
+    for column in INPUT_COLUMNS:
+        df[column] = df[column].fillna('').astype(str).str.strip() if column in df else ''
+
+    df['fallback first name'] = basic_clean_first_names(df['first name'])
+    df['admit date parsed'] = parse_admit_dates(df['admit date'], verifier.date_format)
+    df['admit date key'] = verifier.admit_date_keys(df['admit date'], df['admit date parsed'])
+
+    no_names = (df['first name'] == '') & (df['last name'] == '')
+    no_first, no_last = df['fallback first name'] == '', df['last name'] == ''
+    missing_name = (no_first | no_last) if verifier.require_both_names else (no_first & no_last)
+    missing_date = df['admit date'] == ''
+    invalid_date = df['admit date parsed'].isna()
+    df['input status'] = np.select(
+        [no_names, missing_name, missing_date, invalid_date],
+        [DROPPED, verifier.missing_name_status, verifier.missing_date_status, verifier.invalid_date_status],
+        default='',
+    )
+    return df
+
+def new_result(row, state):
+    """An empty result for a normalized row, in the shape of result_store.RESULT_COLUMNS."""
+    return {
+        'first name': row['first name'], 'last name': row['last name'], 'admit date': row['admit date'], 'state': state,
+        'status': '', 'discipline': '', 'profile links': '', 'unmatched profile links': '',
+    }
+
+def input_result(index, row, state, log_func):
+    """
+    The result for a row whose 'input status' is set, found without a lookup.
+    Returns None for DROPPED rows.
+    """
+    status = row['input status']
+    if status == DROPPED:
+        return None
+    log_func(f"\n  [Record {index+1}] SKIPPED: '{row['first name']} {row['last name']}', admit date '{row['admit date']}' -> {status}")
+    result = new_result(row, state)
+    result['status'] = status
+    return result
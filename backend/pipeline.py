@@ -0,0 +1,126 @@
+# backend/pipeline.py
+
+import queue
+import threading
+import time
+
+_DONE = object()
+# How often blocked stages wake up to check for cancellation.
+_POLL_SECONDS = 0.5
+
+class PipelineCancelled(Exception):
+    """Raised when a pipeline run is stopped before all items were processed."""
+
+    def __init__(self, timings):
+        super().__init__("pipeline cancelled")
+        self.timings = timings
+
+def run_pipeline(items, prepare_batch, process_item, workers=1, batch_size=50, queue_size=100, should_stop=None):
+    """
+    Runs a two-stage pipeline over `items`.
+
+    The preparing stage (one thread) calls `prepare_batch(batch)` on chunks of
+    `batch_size` items and streams `(item, prepared)` pairs into a bounded queue,
+    blocking when the queue is full (backpressure). The processing stage
+    (`workers` threads) consumes that queue with `process_item(item, prepared)`.
+
+    `should_stop` is polled between batches and items; once it returns True,
+    both stages wind down and PipelineCancelled is raised. An exception in
+    either stage also stops the pipeline and is re-raised here.
+
+    Returns a dict of per-stage timings in seconds.
+    """
+    handoff = queue.Queue(maxsize=queue_size)
+    cancel = threading.Event()
+    errors = []
+    lock = threading.Lock()
+    timings = {
+        'prepare_busy': 0.0, 'prepare_blocked': 0.0,
+        'process_busy': 0.0, 'process_idle': 0.0,
+        'items_prepared': 0, 'items_processed': 0,
+    }
+
+    def add(key, amount):
+        with lock:
+            timings[key] += amount
+
+    def stop_requested():
+        if not cancel.is_set() and should_stop and should_stop():
+            cancel.set()
+        return cancel.is_set()
+
+    def put(entry):
+        """Puts onto the queue, giving up if the pipeline is cancelled while blocked."""
+        started = time.monotonic()
+        try:
+            while True:
+                try:
+                    handoff.put(entry, timeout=_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    if stop_requested():
+                        return False
+        finally:
+            add('prepare_blocked', time.monotonic() - started)
+
+    def prepare_stage():
+        try:
+            for start in range(0, len(items), batch_size):
+                if stop_requested():
+                    return
+                batch = items[start:start + batch_size]
+                started = time.monotonic()
+                prepared = prepare_batch(batch)
+                add('prepare_busy', time.monotonic() - started)
+                for item, value in zip(batch, prepared):
+                    if not put((item, value)):
+                        return
+                    add('items_prepared', 1)
+        except Exception as e:
+            errors.append(e)
+            cancel.set()
+        finally:
+            for _ in range(workers):
+                # Best effort: wake every consumer even if the queue is congested.
+                if not put(_DONE):
+                    break
+
+    def process_stage():
+        while True:
+            started = time.monotonic()
+            try:
+                entry = handoff.get(timeout=_POLL_SECONDS)
+            except queue.Empty:
+                add('process_idle', time.monotonic() - started)
+                if stop_requested():
+                    return
+                continue
+            add('process_idle', time.monotonic() - started)
+            if entry is _DONE or stop_requested():
+                return
+            started = time.monotonic()
+            try:
+                process_item(*entry)
+            except Exception as e:
+                errors.append(e)
+                cancel.set()
+                return
+            finally:
+                add('process_busy', time.monotonic() - started)
+            add('items_processed', 1)
+
+    wall_started = time.monotonic()
+    threads = [threading.Thread(target=prepare_stage, name='pipeline-prepare', daemon=True)]
+    threads += [threading.Thread(target=process_stage, name=f'pipeline-process-{i}', daemon=True) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings['wall'] = time.monotonic() - wall_started
+    timings = {key: round(value, 3) if isinstance(value, float) else value for key, value in timings.items()}
+    if errors:
+        raise errors[0]
+    if cancel.is_set():
+        raise PipelineCancelled(timings)
+    return timings
@@ -0,0 +1,75 @@
+# backend/progress.py
+
+import time
+
+# A small Redis hash per job holding row counts, per-status counts and timing,
+# so pollers can get a summary without reading logs or results. For a sharded
+# job it also counts the chunks in each state ('chunks:<status>' fields), kept
+# up to date by the chunks themselves so polling never has to fetch them.
+def _progress_key(job_id):
+    return f"progress:{job_id}"
+
+def init_progress(redis_conn, job_id, total_rows, already_done=0):
+    """Starts (or restarts, after a resume) the progress summary for a job."""
+    now = time.time()
+    redis_conn.hset(_progress_key(job_id), mapping={
+        'total': total_rows,
+        'done': already_done,
+        'done_at_start': already_done,
+        'started_at': now,
+        'updated_at': now,
+    })
+
+def set_chunk_counts(redis_conn, job_id, counts):
+    """Replaces a sharded job's per-status chunk counts, e.g. {'queued': 12}."""
+    key = _progress_key(job_id)
+    stale = [field for field in redis_conn.hkeys(key) if field.decode('utf-8').startswith('chunks:')]
+    pipe = redis_conn.pipeline(transaction=True)
+    if stale:
+        pipe.hdel(key, *stale)
+    pipe.hset(key, mapping={f"chunks:{status}": count for status, count in counts.items()})
+    pipe.execute()
+
+def move_chunk(redis_conn, job_id, from_status, to_status):
+    """Moves one chunk of `job_id` from one status count to another."""
+    pipe = redis_conn.pipeline(transaction=True)
+    pipe.hincrby(_progress_key(job_id), f"chunks:{from_status}", -1)
+    pipe.hincrby(_progress_key(job_id), f"chunks:{to_status}", 1)
+    pipe.execute()
+
+def record_progress(redis_conn, job_id, results):
+    """Counts finished rows; `results` may contain None for rows with no result."""
+    if not results:
+        return
+    pipe = redis_conn.pipeline(transaction=False)
+    pipe.hincrby(_progress_key(job_id), 'done', len(results))
+    for result in results:
+        if result is not None:
+            pipe.hincrby(_progress_key(job_id), f"status:{result.get('status') or 'Unknown'}", 1)
+    pipe.hset(_progress_key(job_id), 'updated_at', time.time())
+    pipe.execute()
+
+def get_progress(redis_conn, job_id):
+    """
+    Returns {'total', 'done', 'statuses', 'eta_seconds', 'chunks'} or None if
+    the job hasn't started. 'chunks' is None unless the job is sharded.
+    """
+    raw = redis_conn.hgetall(_progress_key(job_id))
+    if not raw:
+        return None
+    fields = {key.decode('utf-8'): value.decode('utf-8') for key, value in raw.items()}
+    total = int(fields.get('total', 0))
+    done = int(fields.get('done', 0))
+    done_this_run = done - int(fields.get('done_at_start', 0))
+    elapsed = float(fields.get('updated_at', 0)) - float(fields.get('started_at', 0))
+
+    eta_seconds = None
+    if done_this_run > 0 and done < total:
+        eta_seconds = round(elapsed / done_this_run * (total - done), 1)
+    return {
+        'total': total,
+        'done': done,
+        'statuses': {key[len('status:'):]: int(value) for key, value in fields.items() if key.startswith('status:')},
+        'eta_seconds': eta_seconds,
+        'chunks': {key[len('chunks:'):]: int(value) for key, value in fields.items() if key.startswith('chunks:') and int(value)} or None,
+    }
@@ -0,0 +1,193 @@
+# backend/rate_limiter.py
+
+import os
+import random
+import threading
+import time
+import redis
+
+# Adaptive limiter: the request rate to a host drops by RATE_DECREASE_FACTOR on
+# every throttling signal (429, timeout, empty page) and climbs back by
+# RATE_INCREASE_STEP requests/second per healthy response, never going below
+# MIN_RATE. The ceiling is each site's configured rate.
+MIN_RATE = float(os.getenv('RATE_LIMIT_MIN_RATE', '0.2'))
+RATE_DECREASE_FACTOR = float(os.getenv('RATE_LIMIT_DECREASE_FACTOR', '0.5'))
+RATE_INCREASE_STEP = float(os.getenv('RATE_LIMIT_INCREASE_STEP', '0.05'))
+BUCKET_BURST = float(os.getenv('RATE_LIMIT_BURST', '2'))
+
+# Circuit breaker: after this many lookups in a row fail, the site is treated
+# as down and every worker pauses it for CIRCUIT_COOLDOWN seconds. One more
+# failure after the pause reopens it; one success closes it.
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+CIRCUIT_COOLDOWN = int(os.getenv('CIRCUIT_COOLDOWN', '60'))
+
+# Retries of a failed lookup: full-jitter exponential backoff.
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '2'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '30'))
+
+STATE_TTL = 3600
+
+# Takes one token from a host's bucket, refilled at the bucket's current rate.
+# Returns '0' on success, or how many seconds to wait before trying again.
+# Uses the Redis clock so workers on different machines agree on time.
+_TAKE_TOKEN = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local max_rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at', 'rate')
+local rate = tonumber(state[3]) or max_rate
+local tokens = tonumber(state[1]) or burst
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated_at) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now), 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return tostring(wait)
+"""
+
+# Sets a bucket's rate to rate * factor + step, kept within [min_rate, max_rate].
+_ADJUST_RATE = """
+local max_rate = tonumber(ARGV[1])
+local rate = tonumber(redis.call('HGET', KEYS[1], 'rate')) or max_rate
+rate = rate * tonumber(ARGV[2]) + tonumber(ARGV[3])
+rate = math.max(tonumber(ARGV[4]), math.min(max_rate, rate))
+redis.call('HSET', KEYS[1], 'rate', tostring(rate))
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[5]))
+return tostring(rate)
+"""
+
+_redis_conn = None
+_redis_lock = threading.Lock()
+
+def _get_redis():
+    global _redis_conn
+    with _redis_lock:
+        if _redis_conn is None:
+            _redis_conn = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+    return _redis_conn
+
+class AdaptiveRateLimiter:
+    """
+    A token bucket for one host, kept in Redis so every worker thread and
+    process shares it. acquire() blocks until a request may be sent.
+    """
+
+    def __init__(self, redis_conn, host, max_rate, burst=BUCKET_BURST):
+        self.host = host
+        self.max_rate = max_rate
+        self.burst = burst
+        self._key = f"ratelimit:{host}"
+        self._take = redis_conn.register_script(_TAKE_TOKEN)
+        self._adjust = redis_conn.register_script(_ADJUST_RATE)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'throttled': 0, 'total_wait_seconds': 0.0}
+
+    def acquire(self):
+        started = time.monotonic()
+        while True:
+            wait = float(self._take(keys=[self._key], args=[self.max_rate, self.burst, STATE_TTL]))
+            if wait <= 0:
+                break
+            time.sleep(wait)
+        with self._lock:
+            self._stats['requests'] += 1
+            self._stats['total_wait_seconds'] += time.monotonic() - started
+
+    def record_success(self):
+        return float(self._adjust(keys=[self._key], args=[self.max_rate, 1, RATE_INCREASE_STEP, MIN_RATE, STATE_TTL]))
+
+    def record_throttled(self):
+        with self._lock:
+            self._stats['throttled'] += 1
+        return float(self._adjust(keys=[self._key], args=[self.max_rate, RATE_DECREASE_FACTOR, 0, MIN_RATE, STATE_TTL]))
+
+    def reset_stats(self):
+        """Starts this process's counters over; the shared bucket is untouched."""
+        with self._lock:
+            self._stats = {'requests': 0, 'throttled': 0, 'total_wait_seconds': 0.0}
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['total_wait_seconds'] = round(stats['total_wait_seconds'], 4)
+        return stats
+
+class CircuitBreaker:
+    """
+    Counts consecutive failed lookups against a site in Redis. Once the count
+    reaches CIRCUIT_FAILURE_THRESHOLD the circuit opens, and every worker
+    pauses that site until CIRCUIT_COOLDOWN has passed.
+    """
+
+    def __init__(self, redis_conn, name, threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._conn = redis_conn
+        self._failures_key = f"circuit:{name}:failures"
+        self._open_key = f"circuit:{name}:open"
+
+    def open_for(self):
+        """Seconds until the circuit closes again, or 0 if it is closed."""
+        ttl = self._conn.pttl(self._open_key)
+        return ttl / 1000 if ttl and ttl > 0 else 0
+
+    def record_success(self):
+        self._conn.delete(self._failures_key)
+
+    def record_failure(self):
+        """Returns True if this failure opened the circuit."""
+        failures = self._conn.incr(self._failures_key)
+        self._conn.expire(self._failures_key, STATE_TTL)
+        if failures < self.threshold:
+            return False
+        # Half-open once the cooldown ends: a single further failure reopens it.
+        pipe = self._conn.pipeline(transaction=True)
+        pipe.set(self._open_key, 1, ex=self.cooldown)
+        pipe.set(self._failures_key, self.threshold - 1, ex=STATE_TTL)
+        pipe.execute()
+        return True
+
+    def wait_until_closed(self, should_stop=None, poll_seconds=1.0):
+        """
+        Blocks while the circuit is open. Returns the seconds spent paused (0
+        if it was already closed), or None if `should_stop` fired while waiting.
+        """
+        started = time.monotonic()
+        paused = False
+        while True:
+            remaining = self.open_for()
+            if remaining <= 0:
+                return time.monotonic() - started if paused else 0
+            if should_stop and should_stop():
+                return None
+            time.sleep(min(remaining, poll_seconds))
+            paused = True
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Full-jitter exponential backoff for retry number `attempt` (0-based)."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+_limiters = {}
+_breakers = {}
+_registry_lock = threading.Lock()
+
+def get_rate_limiter(host, max_rate):
+    """Returns this process's limiter for `host`; the bucket itself lives in Redis."""
+    with _registry_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveRateLimiter(_get_redis(), host, max_rate)
+        return _limiters[host]
+
+def get_circuit_breaker(name):
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(_get_redis(), name)
+        return _breakers[name]
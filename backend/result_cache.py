@@ -0,0 +1,71 @@
+# backend/result_cache.py
+
+import json
+import os
+import time
+import pandas as pd
+from normalize import PROFILE_ERRORS
+
+# How long a verified result is trusted before the attorney is re-checked.
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(30 * 24 * 3600)))
+
+CACHED_FIELDS = ('status', 'discipline', 'profile links', 'unmatched profile links')
+
+# Statuses that describe the input or a failed run rather than the attorney;
+# these are cheap to recompute or worth retrying, so they are never cached.
+UNCACHEABLE_STATUSES = {'', 'Processing Error', 'Missing Input Data', 'Invalid Input Date Format', 'Error - Invalid Date Format'}
+
+def _normalize_date(value):
+    try:
+        return pd.to_datetime(value).strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        return value
+
+def result_cache_key(state, first_name, last_name, admit_date):
+    first = " ".join(str(first_name or '').split()).lower()
+    last = " ".join(str(last_name or '').split()).lower()
+    admit = _normalize_date(str(admit_date or '').strip())
+    return f"result_cache:{state}:{first}|{last}|{admit}"
+
+def _row_key(state, row):
+    return result_cache_key(state, row.get('first name', ''), row.get('last name', ''), row.get('admit date', ''))
+
+def lookup_cached_results(redis_conn, state, records_df):
+    """
+    Returns {index: result_dict} for every row of `records_df` with a cached
+    verification, using one MGET for the whole frame.
+    """
+    if records_df.empty:
+        return {}
+    rows = list(records_df.iterrows())
+    values = redis_conn.mget([_row_key(state, row) for _, row in rows])
+
+    hits = {}
+    for (index, row), value in zip(rows, values):
+        if value is None:
+            continue
+        cached = json.loads(value)
+        result = {
+            'first name': str(row.get('first name', '')).strip(),
+            'last name': str(row.get('last name', '')).strip(),
+            'admit date': str(row.get('admit date', '')).strip(),
+            'state': state,
+        }
+        result.update({field: cached.get(field, '') for field in CACHED_FIELDS})
+        hits[index] = result
+    return hits
+
+def store_results(redis_conn, state, results):
+    """
+    Caches every result with a definitive status. A result for which some
+    profile couldn't be read is left out: that profile may have been the match.
+    """
+    pipe = redis_conn.pipeline(transaction=False)
+    fetched_at = time.time()
+    for result in results:
+        if result is None or result.get('status', '') in UNCACHEABLE_STATUSES or result.get(PROFILE_ERRORS):
+            continue
+        entry = {field: result.get(field, '') for field in CACHED_FIELDS}
+        entry['fetched_at'] = fetched_at
+        pipe.set(_row_key(state, result), json.dumps(entry), ex=RESULT_CACHE_TTL)
+    pipe.execute()
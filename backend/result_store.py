@@ -0,0 +1,92 @@
+# backend/result_store.py
+
+import csv
+import io
+import json
+import os
+
+# How long streamed results are kept after the last write.
+RESULTS_TTL = int(os.getenv('RESULTS_TTL', str(7 * 24 * 3600)))
+
+RESULT_COLUMNS = ['first name', 'last name', 'admit date', 'state', 'status', 'discipline', 'profile links', 'unmatched profile links']
+
+# Each finished record is stored once in a hash keyed by its input row number;
+# a list of row numbers records completion order so that offsets handed out to
+# pollers stay stable while the job is still writing. The checkpoint set holds
+# every row that is done, including rows that produced no result, so a resumed
+# job only works on what is left.
+def _results_key(job_id):
+    return f"results:{job_id}"
+
+def _order_key(job_id):
+    return f"results_order:{job_id}"
+
+def _checkpoint_key(job_id):
+    return f"checkpoint:{job_id}"
+
+def _public(result):
+    """A result without the internal '_' keys the engine may set on it."""
+    return {key: value for key, value in result.items() if not key.startswith('_')}
+
+def save_results(redis_conn, job_id, rows_and_results):
+    """Stores (row_number, result_dict) pairs as they finish and checkpoints their rows."""
+    rows_and_results = [(int(row), result) for row, result in rows_and_results]
+    if not rows_and_results:
+        return
+    stored = [(row, result) for row, result in rows_and_results if result is not None]
+    pipe = redis_conn.pipeline(transaction=True)
+    if stored:
+        pipe.hset(_results_key(job_id), mapping={row: json.dumps(_public(result)) for row, result in stored})
+        pipe.rpush(_order_key(job_id), *[row for row, _ in stored])
+    pipe.sadd(_checkpoint_key(job_id), *[row for row, _ in rows_and_results])
+    for key in (_results_key(job_id), _order_key(job_id), _checkpoint_key(job_id)):
+        pipe.expire(key, RESULTS_TTL)
+    pipe.execute()
+
+def get_completed_rows(redis_conn, job_id):
+    """Returns the set of input row numbers already checkpointed for this job."""
+    return {int(row) for row in redis_conn.smembers(_checkpoint_key(job_id))}
+
+def save_result(redis_conn, job_id, row, result):
+    save_results(redis_conn, job_id, [(row, result)])
+
+def count_results(redis_conn, job_id):
+    return redis_conn.llen(_order_key(job_id))
+
+def read_results_page(redis_conn, job_id, offset=0, limit=100):
+    """
+    Returns up to `limit` results in completion order starting at `offset`.
+    Each item carries its input row number under 'row'.
+    """
+    rows = redis_conn.lrange(_order_key(job_id), offset, offset + limit - 1) if limit > 0 else []
+    if not rows:
+        return []
+    values = redis_conn.hmget(_results_key(job_id), rows)
+    items = []
+    for row, value in zip(rows, values):
+        if value is not None:
+            item = json.loads(value)
+            item['row'] = int(row)
+            items.append(item)
+    return items
+
+def iter_results_in_order(redis_conn, job_id, total_rows, page_size=500):
+    """Yields stored results by input row number, one page of HMGET at a time."""
+    for start in range(0, total_rows, page_size):
+        rows = list(range(start, min(start + page_size, total_rows)))
+        for value in redis_conn.hmget(_results_key(job_id), rows):
+            if value is not None:
+                yield json.loads(value)
+
+def iter_results_csv(redis_conn, job_id, total_rows):
+    """Streams the results as CSV text, one line at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=RESULT_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for result in iter_results_in_order(redis_conn, job_id, total_rows):
+        writer.writerow(result)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.getvalue():
+        yield buffer.getvalue()
@@ -0,0 +1,119 @@
+# backend/sharding.py
+
+import os
+from rq import Queue
+from rq.job import Dependency, Job
+
+from tasks import merge_chunk_results, run_scraper_task
+from progress import init_progress, set_chunk_counts
+from result_store import RESULTS_TTL, get_completed_rows
+from ingest import slice_input_ref
+
+JOB_TIMEOUT = '2h'
+# RQ drops a finished job's hash after 500s by default, which would take
+# /status, the CSV download and /resume down with it. Keep jobs as long as
+# their results and checkpoint.
+JOB_TTLS = {'result_ttl': RESULTS_TTL, 'failure_ttl': RESULTS_TTL}
+# Uploads with more rows than this are split into chunk jobs that any number
+# of RQ workers can pick up in parallel.
+SHARD_SIZE = int(os.getenv('SHARD_SIZE', '500'))
+
+def enqueue_verification(q: Queue, redis_conn, job_id, state, input_ref, api_key, mapping, workers=None, force_refresh=False):
+    """
+    Enqueues a verification run for the stored upload `input_ref` under
+    `job_id`, the ID the client should poll. Jobs only receive references to
+    the stored rows, never the rows themselves.
+
+    Small uploads become a single run_scraper_task job. Larger ones become one
+    chunk job per SHARD_SIZE rows plus a merge job that depends on all of them;
+    the merge job's ID is the parent ID, and every chunk reports its logs,
+    results and progress under it.
+    """
+    total_rows = input_ref['stop'] - input_ref['start']
+    if total_rows <= SHARD_SIZE:
+        job = q.enqueue(
+            run_scraper_task,
+            job_id=job_id,
+            args=(state, input_ref, api_key, mapping, workers, force_refresh),
+            job_timeout=JOB_TIMEOUT,
+            **JOB_TTLS
+        )
+        return job.id
+
+    init_progress(redis_conn, job_id, total_rows)
+    chunk_jobs = []
+    for chunk_number, start in enumerate(range(0, total_rows, SHARD_SIZE)):
+        chunk_ref = slice_input_ref(input_ref, start, min(start + SHARD_SIZE, total_rows))
+        chunk_jobs.append(q.enqueue(
+            run_scraper_task,
+            job_id=f"{job_id}-chunk-{chunk_number}",
+            args=(state, chunk_ref, api_key, mapping, workers, force_refresh),
+            kwargs={'parent_id': job_id},
+            job_timeout=JOB_TIMEOUT,
+            **JOB_TTLS
+        ))
+
+    set_chunk_counts(redis_conn, job_id, {'queued': len(chunk_jobs)})
+    redis_conn.rpush(f"logs:{job_id}", f"--- [Shards] {total_rows} rows split into {len(chunk_jobs)} chunk job(s) of up to {SHARD_SIZE} rows. ---")
+    parent = q.enqueue(
+        merge_chunk_results,
+        job_id=job_id,
+        args=(state,),
+        depends_on=Dependency(jobs=chunk_jobs, allow_failure=True),
+        meta={'status': 'queued', 'total_rows': total_rows, 'chunk_ids': [job.id for job in chunk_jobs]},
+        job_timeout=JOB_TIMEOUT,
+        **JOB_TTLS
+    )
+    return parent.id
+
+def chunk_status_counts(redis_conn, job):
+    """
+    Returns {rq_status: count} over a parent job's chunks, or None for
+    unsharded jobs. It fetches every chunk, so pollers read the counts kept in
+    the job's progress hash instead.
+    """
+    chunk_ids = job.meta.get('chunk_ids')
+    if not chunk_ids:
+        return None
+    counts = {}
+    for chunk in Job.fetch_many(chunk_ids, connection=redis_conn):
+        status = chunk.get_status() if chunk else 'expired'
+        counts[status] = counts.get(status, 0) + 1
+    return counts
+
+def resume_verification(q: Queue, redis_conn, job):
+    """
+    Re-enqueues an interrupted job under the same ID; its checkpoint makes it
+    skip finished rows. For a sharded job, only the chunks that didn't finish
+    are re-enqueued, followed by a new merge step.
+    """
+    chunk_ids = job.meta.get('chunk_ids')
+    if not chunk_ids:
+        return q.enqueue(job.func, job_id=job.id, args=job.args, kwargs=job.kwargs, job_timeout=JOB_TIMEOUT, **JOB_TTLS)
+
+    chunks = [chunk for chunk in Job.fetch_many(chunk_ids, connection=redis_conn) if chunk is not None]
+    unfinished = [chunk for chunk in chunks if chunk.get_status() != 'finished' or chunk.meta.get('status') != 'finished']
+    requeued = [
+        q.enqueue(chunk.func, job_id=chunk.id, args=chunk.args, kwargs=chunk.kwargs, job_timeout=JOB_TIMEOUT, **JOB_TTLS)
+        for chunk in unfinished
+    ]
+
+    total_rows = job.meta.get('total_rows', 0)
+    init_progress(redis_conn, job.id, total_rows, len(get_completed_rows(redis_conn, job.id)))
+    counts = {'queued': len(requeued), 'finished': len(chunks) - len(unfinished)}
+    if len(chunks) < len(chunk_ids):
+        counts['expired'] = len(chunk_ids) - len(chunks)
+    set_chunk_counts(redis_conn, job.id, counts)
+    return q.enqueue(
+        merge_chunk_results,
+        job_id=job.id,
+        args=job.args,
+        depends_on=Dependency(jobs=requeued, allow_failure=True) if requeued else None,
+        meta={'status': 'queued', 'total_rows': total_rows, 'chunk_ids': chunk_ids},
+        job_timeout=JOB_TIMEOUT,
+        **JOB_TTLS
+    )
+
+def has_active_chunks(redis_conn, job):
+    counts = chunk_status_counts(redis_conn, job) or {}
+    return any(counts.get(status) for status in ('queued', 'started', 'deferred'))
@@ -1,49 +1,214 @@
 # backend/tasks.py
 
+import os
 import redis
-import json
+from rq import get_current_job
 from rq.job import Job
-import os
 
-# Import your scraper functions
-from georgia_scraper import run_georgia_verification
-from california_scraper import run_california_verification
+# Import the state bar plugins and the engine that runs them
+from verifiers import get_verifier
+from engine import PageTimings, verify_record
+from driver_pool import get_driver_pool, shutdown_driver_pool
+from rate_limiter import get_circuit_breaker, get_rate_limiter
+from ai_utils import NAME_BATCH_SIZE, clean_names_batch, get_name_cleaning_stats, reset_name_cleaning_stats
+from pipeline import PipelineCancelled, run_pipeline
+from result_cache import lookup_cached_results, store_results
+from job_cache import JobCache
+from result_store import count_results, get_completed_rows, save_result, save_results
+from progress import init_progress, move_chunk, record_progress
+from ingest import load_records
+from metrics import count_job, count_records, flush_metrics, get_stage_histograms, merge_stage_histograms, reset_stage_histograms, span
+from normalize import input_result, normalize_records
+
+# Default number of browser workers per job when the request doesn't specify one.
+DEFAULT_WORKERS = int(os.getenv('SCRAPER_WORKERS', '1'))
+# How many cleaned names may wait for a browser before the cleaning stage pauses.
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+
+def clean_row_names(batch, api_key):
+    """Cleans the first names of a batch of normalized (index, row) items in one call."""
+    pairs = [(row['first name'], row['last name']) for _, row in batch]
+    with span('ai_clean'):
+        return clean_names_batch(pairs, api_key)
+
+def verify_records(state, records_df, api_key, log_func, workers, on_result, should_stop=None, job_cache=None, page_timings=None):
+    """
+    Verifies every row of `records_df` as a two-stage pipeline: name cleaning
+    streams ahead of up to `workers` browser threads, so Gemini latency overlaps
+    with page loads. Each record's log lines are written in a single push so
+    records never interleave in the job log, and `on_result(index, result)` is
+    called as soon as a record finishes. Identical input rows are verified once,
+    and `job_cache` lets records share searches and profile pages. Browser
+    time is split into navigation and waiting in `page_timings`. While the
+    state's circuit breaker is open, workers pause instead of taking records.
+
+    Returns the stage timings. If `should_stop` fires, raises PipelineCancelled.
+    """
+    verifier = get_verifier(state)
+    workers = max(1, min(workers, verifier.max_workers))
+    pool = get_driver_pool(size=workers)
+    # Shared with every worker verifying this state; open while its site is down.
+    breaker = get_circuit_breaker(state)
+    job_cache = job_cache or JobCache()
+
+    items = []
+    duplicates_of = {}
+    first_seen = {}
+    for index, row in records_df.iterrows():
+        row_key = (" ".join(row['first name'].split()).lower(), " ".join(row['last name'].split()).lower(), row['admit date key'])
+        if row_key in first_seen:
+            duplicates_of[first_seen[row_key]].append((index, row))
+        else:
+            first_seen[row_key] = index
+            duplicates_of[index] = []
+            items.append((index, row))
+    duplicate_count = len(records_df) - len(items)
+    if duplicate_count:
+        log_func(f"--- [Dedupe] {duplicate_count} duplicate row(s) will reuse the result of an identical earlier row. ---")
+
+    def process(item, name_cleaning):
+        index, row = item
+        paused = breaker.wait_until_closed(should_stop)
+        if paused is None:
+            return
+        if paused:
+            log_func(f"--- [Circuit] {verifier.label} was paused for {paused:.0f}s after repeated failures; resuming. ---")
+        record_logs = []
+        try:
+            result = verify_record(verifier, index, row, api_key, record_logs.append, pool, name_cleaning, job_cache, page_timings)
+        finally:
+            if record_logs:
+                log_func(*record_logs)
+        on_result(index, result)
+        for duplicate_index, duplicate_row in duplicates_of[index]:
+            duplicate = None
+            if result is not None:
+                duplicate = dict(result)
+                duplicate.update({column: duplicate_row[column] for column in ('first name', 'last name', 'admit date')})
+            on_result(duplicate_index, duplicate)
+
+    log_func(f"--- [Module Start] Starting {verifier.label} Bar Verification with {workers} worker(s) ---")
+    return run_pipeline(
+        items, lambda batch: clean_row_names(batch, api_key), process,
+        workers=workers, batch_size=NAME_BATCH_SIZE, queue_size=PIPELINE_QUEUE_SIZE, should_stop=should_stop,
+    )
 
-def run_scraper_task(job_id, state, csv_data, api_key, mapping):
+def run_scraper_task(state, input_ref, api_key, mapping, workers=None, force_refresh=False, parent_id=None):
     """
     This is the main function that the RQ worker will execute.
     It runs the scraper and saves the logs and results to Redis.
+
+    `input_ref` points at the rows stored by ingest.ingest_upload. For a chunk
+    of a sharded upload, `parent_id` names the parent job whose logs, results,
+    checkpoint and progress this chunk writes into.
     """
     # Connect to Redis
     redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
     redis_conn = redis.from_url(redis_url)
 
     # Get the job instance
-    job = Job.fetch(job_id, connection=redis_conn)
+    job = get_current_job(connection=redis_conn)
     job.meta['status'] = 'running'
     job.save_meta()
-    
+    # Chunks of a sharded upload report under their parent job's ID.
+    job_id = parent_id or job.id
+    if parent_id:
+        move_chunk(redis_conn, parent_id, 'queued', 'running')
+
     # A helper function to append logs to Redis
-    def log_to_redis(message):
-        redis_conn.rpush(f"logs:{job_id}", message)
+    def log_to_redis(*messages):
+        redis_conn.rpush(f"logs:{job_id}", *messages)
+
+    # Set by the /stop/<job_id> endpoint.
+    def stop_requested():
+        return bool(redis_conn.exists(f"stop:{job_id}"))
+
+    job_cache = JobCache()
+    page_timings = PageTimings()
+    verifier = None
+    reset_stage_histograms()
+    reset_name_cleaning_stats()
 
     try:
-        # Choose the correct scraper function
-        if state == 'georgia':
-            scraper_generator = run_georgia_verification(csv_data, api_key, log_to_redis)
-        elif state == 'california':
-            scraper_generator = run_california_verification(csv_data, api_key, log_to_redis)
-        else:
-            raise ValueError("Invalid state provided")
+        verifier = get_verifier(state)
+        # The limiter lives as long as the process; count only this job's requests.
+        get_rate_limiter(verifier.host, verifier.max_rate).reset_stats()
+
+        records_df = load_records(redis_conn, input_ref)
+        total_rows = len(records_df)
+        job.meta['total_rows'] = total_rows
+        job.save_meta()
+
+        # A re-enqueued or resumed job skips every row its checkpoint already covers.
+        already_done = records_df.index.isin(list(get_completed_rows(redis_conn, job_id)))
+        resumed_rows = int(already_done.sum())
+        if resumed_rows:
+            records_df = records_df[~already_done]
+            log_to_redis(f"--- [Resume] {resumed_rows} of {total_rows} row(s) already done; processing the remaining {len(records_df)}. ---")
+        job.meta['resumed_rows'] = resumed_rows
+        if not parent_id:
+            # The parent's progress summary is set up when the shards are enqueued.
+            init_progress(redis_conn, job_id, total_rows, resumed_rows)
+
+        # Normalize names and dates for the whole frame at once; rows whose input
+        # can't be looked up get their status here and never reach a browser.
+        with span('normalize'):
+            records_df = normalize_records(records_df, verifier)
+        unusable = records_df['input status'] != ''
+        if unusable.any():
+            skip_logs = []
+            skipped = [(index, input_result(index, row, state, skip_logs.append)) for index, row in records_df[unusable].iterrows()]
+            save_results(redis_conn, job_id, skipped)
+            record_progress(redis_conn, job_id, [result for _, result in skipped])
+            count_records(redis_conn, state, [result for _, result in skipped])
+            skip_logs.append(f"--- [Input] {len(skipped)} row(s) with missing or invalid input were answered without a lookup. ---")
+            log_to_redis(*skip_logs)
+            records_df = records_df[~unusable]
+        job.meta['skipped_rows'] = int(unusable.sum())
+
+        # Serve previously verified attorneys from the cache; only misses are scraped.
+        with span('cache_lookup'):
+            cached = {} if force_refresh else lookup_cached_results(redis_conn, state, records_df)
+        save_results(redis_conn, job_id, cached.items())
+        record_progress(redis_conn, job_id, list(cached.values()))
+        count_records(redis_conn, state, cached.values())
+        hit_ratio = len(cached) / len(records_df) if len(records_df) else 0.0
+        job.meta['result_cache'] = {'hits': len(cached), 'misses': len(records_df) - len(cached), 'hit_ratio': round(hit_ratio, 4), 'force_refresh': bool(force_refresh)}
+        job.save_meta()
+        log_to_redis(f"--- [Cache] {len(cached)} of {len(records_df)} record(s) served from the result cache ({hit_ratio:.0%}). ---")
+
+        # Each record is written to the job's result store and checkpoint (and the
+        # result cache) the moment it finishes, so partial results survive a crash.
+        def on_result(index, result):
+            with span('result_write'):
+                save_result(redis_conn, job_id, index, result)
+                record_progress(redis_conn, job_id, [result])
+                if result is not None:
+                    store_results(redis_conn, state, [result])
+            count_records(redis_conn, state, [result])
+            flush_metrics(redis_conn)
+
+        misses_df = records_df[~records_df.index.isin(list(cached))]
+        try:
+            stage_timings = verify_records(state, misses_df, api_key, log_to_redis, workers or DEFAULT_WORKERS, on_result, stop_requested, job_cache, page_timings)
+        except PipelineCancelled as e:
+            # Whatever finished before the stop request is already stored.
+            job.meta['status'] = 'stopped'
+            job.meta['results_count'] = count_results(redis_conn, job_id)
+            job.meta['stage_timings'] = e.timings
+            job.save_meta()
+            if not parent_id:
+                log_to_redis(f"\n--- [Module Stop] {state.capitalize()} verification stopped by request. ---")
+            return
 
-        # The scraper now returns the final results directly
-        final_results_df = scraper_generator
-        
-        # Save the final results to Redis
         job.meta['status'] = 'finished'
-        job.meta['results'] = final_results_df.to_json(orient='records')
+        job.meta['results_count'] = count_results(redis_conn, job_id)
+        job.meta['stage_timings'] = stage_timings
         job.save_meta()
-        log_to_redis(f"\n--- [Module End] {state.capitalize()} verification complete. ---")
+        if parent_id:
+            log_to_redis(f"--- [Chunk End] Rows {input_ref['start'] + 1}-{input_ref['stop']} complete. ---")
+        else:
+            log_to_redis(f"\n--- [Module End] {state.capitalize()} verification complete. ---")
 
     except Exception as e:
         # If anything goes wrong, log the error and mark the job as failed
@@ -51,4 +216,94 @@ def run_scraper_task(job_id, state, csv_data, api_key, mapping):
         log_to_redis(error_message)
         job.meta['status'] = 'failed'
         job.meta['error'] = error_message
-        job.save_meta()
\ No newline at end of file
+        job.save_meta()
+
+    finally:
+        # Record how well the warm Chrome sessions were reused, then close them
+        # so no orphaned browsers outlive the job.
+        job.meta['driver_pool'] = get_driver_pool().get_stats()
+        job.meta['name_cleaning'] = get_name_cleaning_stats()
+        job.meta['job_cache'] = job_cache.get_stats()
+        job.meta['page_timings'] = page_timings.get_stats()
+        if verifier:
+            job.meta['rate_limiter'] = get_rate_limiter(verifier.host, verifier.max_rate).get_stats()
+        shutdown_driver_pool()
+        job.meta['stage_histograms'] = get_stage_histograms()
+        job.save_meta()
+        flush_metrics(redis_conn)
+        if parent_id:
+            move_chunk(redis_conn, parent_id, 'running', job.meta.get('status'))
+        else:
+            count_job(redis_conn, state, job.meta.get('status'))
+
+# Summed across chunks when a sharded job is merged.
+AGGREGATED_META_KEYS = ('stage_timings', 'result_cache', 'name_cleaning', 'job_cache', 'driver_pool', 'page_timings', 'rate_limiter')
+# Stats that are not counters. Ratios and averages are recomputed from the
+# summed counters below; chunks run side by side, so the parent's wall time is
+# the longest chunk's rather than their sum.
+DERIVED_STATS = {'result_cache': ('hit_ratio',), 'driver_pool': ('avg_checkout_wait_seconds',)}
+MAX_STATS = {'stage_timings': ('wall',)}
+
+def _sum_stats(stats_dicts, skip=(), maxima=()):
+    totals = {}
+    for stats in stats_dicts:
+        for key, value in (stats or {}).items():
+            if key in skip or not isinstance(value, (int, float)) or isinstance(value, bool):
+                continue
+            if key in maxima:
+                totals[key] = max(totals.get(key, 0), value)
+            else:
+                totals[key] = round(totals.get(key, 0) + value, 4)
+    return totals
+
+def merge_chunk_stats(chunks):
+    """Rolls the chunks' AGGREGATED_META_KEYS stats up into the parent's."""
+    merged = {}
+    for key in AGGREGATED_META_KEYS:
+        merged[key] = _sum_stats((chunk.meta.get(key) for chunk in chunks), DERIVED_STATS.get(key, ()), MAX_STATS.get(key, ()))
+
+    result_cache = merged['result_cache']
+    lookups = result_cache.get('hits', 0) + result_cache.get('misses', 0)
+    result_cache['hit_ratio'] = round(result_cache.get('hits', 0) / lookups, 4) if lookups else 0.0
+    result_cache['force_refresh'] = any((chunk.meta.get('result_cache') or {}).get('force_refresh') for chunk in chunks)
+
+    driver_pool = merged['driver_pool']
+    checkouts = driver_pool.get('checkouts', 0)
+    driver_pool['avg_checkout_wait_seconds'] = round(driver_pool.get('total_wait_seconds', 0) / checkouts, 4) if checkouts else 0.0
+    return merged
+
+def merge_chunk_results(state):
+    """
+    Final step of a sharded upload, run as the parent job once every chunk job
+    has finished or failed. Chunks already wrote their results under the
+    parent's ID by input row number, so the CSV comes out in input order; this
+    step rolls up the chunks' stats and sets the parent's final status.
+    """
+    redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379')
+    redis_conn = redis.from_url(redis_url)
+    job = get_current_job(connection=redis_conn)
+    job_id = job.id
+
+    chunk_ids = job.meta.get('chunk_ids', [])
+    chunks = [chunk for chunk in Job.fetch_many(chunk_ids, connection=redis_conn) if chunk is not None]
+    failed = [chunk.id for chunk in chunks if chunk.get_status() == 'failed' or chunk.meta.get('status') == 'failed']
+    stopped = any(chunk.meta.get('status') == 'stopped' for chunk in chunks)
+
+    job.meta.update(merge_chunk_stats(chunks))
+    job.meta['stage_histograms'] = merge_stage_histograms(chunk.meta.get('stage_histograms') for chunk in chunks)
+    job.meta['results_count'] = count_results(redis_conn, job_id)
+    if len(chunks) < len(chunk_ids):
+        failed.append(f"{len(chunk_ids) - len(chunks)} expired chunk(s)")
+
+    if failed:
+        job.meta['status'] = 'failed'
+        job.meta['error'] = f"!!! MODULE ERROR: {len(failed)} of {len(chunk_ids)} chunk(s) did not finish: {', '.join(failed)}. Use /resume/{job_id} to retry the remaining rows. !!!"
+        redis_conn.rpush(f"logs:{job_id}", job.meta['error'])
+    elif stopped:
+        job.meta['status'] = 'stopped'
+        redis_conn.rpush(f"logs:{job_id}", f"\n--- [Module Stop] {state.capitalize()} verification stopped by request. ---")
+    else:
+        job.meta['status'] = 'finished'
+        redis_conn.rpush(f"logs:{job_id}", f"\n--- [Module End] {state.capitalize()} verification complete across {len(chunk_ids)} chunk(s). ---")
+    job.save_meta()
+    count_job(redis_conn, state, job.meta['status'])
@@ -0,0 +1,55 @@
+# backend/tests/conftest.py
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+sys.path.insert(0, BACKEND_DIR)
+
+# Saved pages served by the fixture site, keyed by path and query parameters.
+ROUTES = {
+    ('/attorney/LicenseeSearch/QuickSearch', (('FreeText', 'Jane Doe'),)): 'calbar_search.html',
+    ('/attorney/LicenseeSearch/QuickSearch', (('FreeText', 'Nobody Here'),)): 'calbar_search_empty.html',
+    ('/attorney/Licensee/Detail/123456', ()): 'calbar_profile.html',
+    ('/member-directory/', (('firstName', 'John'), ('lastName', 'Smith'))): 'gabar_search.html',
+    ('/member-directory/', (('firstName', 'Nobody'), ('lastName', 'Here'))): 'gabar_search_empty.html',
+    ('/member-directory/', (('firstName', 'Client'), ('lastName', 'Side'))): 'gabar_search_client_side.html',
+    ('/member-directory/', (('id', '1001'),)): 'gabar_profile.html',
+    ('/member-directory/', (('id', '1002'),)): 'gabar_profile_other.html',
+    ('/member-directory/', (('firstName', 'Anna'), ('lastName', 'Script'))): 'gabar_search_scripted.html',
+    ('/member-directory/', (('id', '2001'),)): 'gabar_profile_scripted.html',
+    ('/member-directory/', (('firstName', 'Ben'), ('lastName', 'Script'))): 'gabar_search_scripted_other.html',
+    ('/member-directory/', (('id', '2002'),)): 'gabar_profile_scripted_other.html',
+}
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        fixture = ROUTES.get((url.path, tuple(sorted(parse_qsl(url.query)))))
+        if fixture is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as page:
+            body = page.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture(scope='session')
+def fixture_site():
+    """Base URL of a local server answering with the saved pages in tests/fixtures."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
@@ -0,0 +1,26 @@
+# backend/tests/test_chunk_stats.py
+
+from types import SimpleNamespace
+from tasks import merge_chunk_stats
+
+def chunk(**meta):
+    return SimpleNamespace(meta=meta)
+
+def test_counters_add_up_and_ratios_are_recomputed():
+    chunks = [
+        chunk(result_cache={'hits': 2, 'misses': 30, 'hit_ratio': 0.0625, 'force_refresh': False},
+              driver_pool={'checkouts': 1, 'total_wait_seconds': 3.0, 'avg_checkout_wait_seconds': 3.0},
+              stage_timings={'wall': 40.0, 'items_processed': 30}),
+        chunk(result_cache={'hits': 0, 'misses': 30, 'hit_ratio': 0.0, 'force_refresh': True},
+              driver_pool={'checkouts': 3, 'total_wait_seconds': 1.0, 'avg_checkout_wait_seconds': 0.3333},
+              stage_timings={'wall': 55.5, 'items_processed': 30}),
+    ]
+    merged = merge_chunk_stats(chunks)
+    assert merged['result_cache'] == {'hits': 2, 'misses': 60, 'hit_ratio': 0.0323, 'force_refresh': True}
+    assert merged['driver_pool'] == {'checkouts': 4, 'total_wait_seconds': 4.0, 'avg_checkout_wait_seconds': 1.0}
+    assert merged['stage_timings'] == {'wall': 55.5, 'items_processed': 60}
+
+def test_chunks_without_stats():
+    merged = merge_chunk_stats([chunk(), chunk()])
+    assert merged['result_cache'] == {'hit_ratio': 0.0, 'force_refresh': False}
+    assert merged['job_cache'] == {}
@@ -0,0 +1,215 @@
+# backend/tests/test_http_lookup.py
+
+import pandas as pd
+import pytest
+from selenium.common.exceptions import TimeoutException
+import california_scraper
+import georgia_scraper
+from california_scraper import CaliforniaVerifier
+from georgia_scraper import GeorgiaVerifier
+from engine import _lookup, match_record
+from http_lookup import PageParseError
+from job_cache import JobCache
+from normalize import PROFILE_ERRORS, new_result, normalize_records
+
+@pytest.fixture
+def calbar(fixture_site, monkeypatch):
+    monkeypatch.setattr(california_scraper, 'BASE_URL', f"{fixture_site}/attorney/LicenseeSearch/QuickSearch")
+    return CaliforniaVerifier()
+
+@pytest.fixture
+def gabar(fixture_site, monkeypatch):
+    monkeypatch.setattr(georgia_scraper, 'BASE_URL', f"{fixture_site}/member-directory/")
+    return GeorgiaVerifier()
+
+def normalized_row(verifier, first_name, last_name, admit_date):
+    records = pd.DataFrame([{'first name': first_name, 'last name': last_name, 'admit date': admit_date}])
+    return normalize_records(records, verifier).iloc[0]
+
+def lookup_http(verifier, row, terms):
+    logs = []
+    result = match_record(
+        verifier, row, terms, new_result(row, verifier.name), logs.append, JobCache(),
+        verifier.search_http, verifier.read_profile_http,
+    )
+    return result, logs
+
+class _NoLimit:
+    def acquire(self):
+        pass
+
+    def record_success(self):
+        pass
+
+    def record_throttled(self):
+        pass
+
+class _OneBrowserPool:
+    def __init__(self):
+        self.checkouts = 0
+
+    def checkout(self):
+        self.checkouts += 1
+        return object()
+
+    def release(self, driver):
+        pass
+
+# --- California ---
+
+def test_calbar_search_lists_profiles_with_admit_month(calbar, fixture_site):
+    outcome = calbar.search_http('Jane Doe')
+    assert outcome == {'found': True, 'rows': [
+        [f"{fixture_site}/attorney/Licensee/Detail/123456", 'June 1992'],
+        [f"{fixture_site}/attorney/Licensee/Detail/654321", 'March 2004'],
+    ]}
+
+def test_calbar_search_without_results(calbar):
+    assert calbar.search_http('Nobody Here') == {'found': False}
+
+def test_calbar_profile(calbar, fixture_site):
+    profile = calbar.read_profile_http(f"{fixture_site}/attorney/Licensee/Detail/123456")
+    assert profile == {'admit_date': '06/06/1992', 'status': 'Active', 'discipline': 'No discipline found'}
+
+def test_calbar_profile_without_details_raises(calbar, fixture_site):
+    with pytest.raises(PageParseError):
+        calbar.read_profile_http(f"{fixture_site}/attorney/LicenseeSearch/QuickSearch?FreeText=Nobody+Here")
+
+def test_calbar_exact_match(calbar, fixture_site):
+    row = normalized_row(calbar, 'Jane', 'Doe', '06/06/1992')
+    result, _ = lookup_http(calbar, row, calbar.search_terms('Jane', 'Doe'))
+    assert result['status'] == 'Active'
+    assert result['discipline'] == 'No discipline found'
+    assert result['profile links'] == f"{fixture_site}/attorney/Licensee/Detail/123456"
+    assert result['unmatched profile links'] == ''
+
+def test_calbar_same_month_other_day_fails_verification(calbar, fixture_site):
+    row = normalized_row(calbar, 'Jane', 'Doe', '06/07/1992')
+    result, _ = lookup_http(calbar, row, calbar.search_terms('Jane', 'Doe'))
+    assert result['status'] == 'Verification Failed'
+    assert result['unmatched profile links'] == f"{fixture_site}/attorney/Licensee/Detail/123456"
+
+def test_calbar_not_found(calbar):
+    row = normalized_row(calbar, 'Nobody', 'Here', '06/06/1992')
+    result, _ = lookup_http(calbar, row, calbar.search_terms('Nobody', 'Here'))
+    assert result['status'] == 'Not Found'
+
+# --- Georgia ---
+
+def test_gabar_search_lists_each_profile_once(gabar, fixture_site):
+    outcome = gabar.search_http('John', 'Smith')
+    assert outcome == {'found': True, 'urls': [
+        f"{fixture_site}/member-directory/?id=1001",
+        f"{fixture_site}/member-directory/?id=1002",
+    ]}
+
+def test_gabar_search_without_results(gabar):
+    assert gabar.search_http('Nobody', 'Here') == {'found': False}
+
+def test_gabar_search_rendered_client_side_raises(gabar):
+    with pytest.raises(PageParseError):
+        gabar.search_http('Client', 'Side')
+
+def test_gabar_profile(gabar, fixture_site):
+    profile = gabar.read_profile_http(f"{fixture_site}/member-directory/?id=1001")
+    assert profile == {'admit_date': '3/7/2001', 'status': 'Active Member in Good Standing', 'discipline': 'None'}
+
+def test_gabar_exact_match(gabar, fixture_site):
+    row = normalized_row(gabar, 'John', 'Smith', '2001-03-07')
+    result, _ = lookup_http(gabar, row, gabar.search_terms('John', 'Smith'))
+    assert result['status'] == 'Active Member in Good Standing'
+    assert result['profile links'] == f"{fixture_site}/member-directory/?id=1001"
+
+def test_gabar_admit_date_mismatch(gabar, fixture_site):
+    row = normalized_row(gabar, 'John', 'Smith', '1/1/1999')
+    result, _ = lookup_http(gabar, row, gabar.search_terms('John', 'Smith'))
+    assert result['status'] == 'Admit Date Mismatch'
+    assert result['unmatched profile links'] == f"{fixture_site}/member-directory/?id=1001, {fixture_site}/member-directory/?id=1002"
+
+def test_gabar_not_found(gabar):
+    row = normalized_row(gabar, 'Nobody', 'Here', '1/1/1999')
+    result, _ = lookup_http(gabar, row, gabar.search_terms('Nobody', 'Here'))
+    assert result['status'] == 'Not Found'
+
+# --- Browser fallback ---
+
+def test_unparseable_page_falls_back_to_the_browser(gabar, monkeypatch):
+    browser_searches = []
+    def search_selenium(driver, wait, first_name, last_name):
+        browser_searches.append((first_name, last_name))
+        return {'found': False}
+    monkeypatch.setattr(gabar, 'search_selenium', search_selenium)
+
+    row = normalized_row(gabar, 'Client', 'Side', '1/1/1999')
+    pool = _OneBrowserPool()
+    logs = []
+    record_timings = {'record_seconds': 0.0, 'checkout_seconds': 0.0, 'navigation_seconds': 0.0, 'wait_seconds': 0.0, 'navigations': 0, 'waits': 0}
+    result = _lookup(gabar, row, ('Client', 'Side'), new_result(row, gabar.name), logs.append, JobCache(), pool, _NoLimit(), record_timings)
+
+    assert browser_searches == [('Client', 'Side')]
+    assert pool.checkouts == 1
+    assert result['status'] == 'Not Found'
+    assert any('[HTTP] Could not read the page' in line for line in logs)
+
+def test_unparseable_search_page_sends_the_rest_of_the_job_to_the_browser(gabar, monkeypatch):
+    http_searches = []
+    search_http = gabar.search_http
+    def counting_search_http(first_name, last_name):
+        http_searches.append((first_name, last_name))
+        return search_http(first_name, last_name)
+    monkeypatch.setattr(gabar, 'search_http', counting_search_http)
+    monkeypatch.setattr(gabar, 'search_selenium', lambda driver, wait, first_name, last_name: {'found': False})
+
+    job_cache = JobCache()
+    pool = _OneBrowserPool()
+    for first_name, last_name in (('Client', 'Side'), ('Nobody', 'Here')):
+        row = normalized_row(gabar, first_name, last_name, '1/1/1999')
+        record_timings = {'record_seconds': 0.0, 'checkout_seconds': 0.0, 'navigation_seconds': 0.0, 'wait_seconds': 0.0, 'navigations': 0, 'waits': 0}
+        _lookup(gabar, row, (first_name, last_name), new_result(row, gabar.name), [].append, job_cache, pool, _NoLimit(), record_timings)
+
+    assert http_searches == [('Client', 'Side')]
+    assert pool.checkouts == 2
+
+def test_unparseable_profile_sends_the_rest_of_the_jobs_profiles_to_the_browser(gabar, fixture_site, monkeypatch):
+    http_profiles = []
+    read_profile_http = gabar.read_profile_http
+    def counting_read_profile_http(url, admit_date_key=None):
+        http_profiles.append(url)
+        return read_profile_http(url, admit_date_key)
+    browser_profiles = []
+    def read_profile_selenium(driver, wait, url, admit_date_key):
+        browser_profiles.append(url)
+        return {'admit_date': '5/2/2010', 'status': 'Active Member in Good Standing', 'discipline': 'None'}
+    monkeypatch.setattr(gabar, 'read_profile_http', counting_read_profile_http)
+    monkeypatch.setattr(gabar, 'read_profile_selenium', read_profile_selenium)
+    monkeypatch.setattr(gabar, 'search_selenium', lambda driver, wait, first_name, last_name: {'found': False})
+
+    job_cache = JobCache()
+    pool = _OneBrowserPool()
+    results = []
+    for first_name in ('Anna', 'Ben'):
+        row = normalized_row(gabar, first_name, 'Script', '5/2/2010')
+        record_timings = {'record_seconds': 0.0, 'checkout_seconds': 0.0, 'navigation_seconds': 0.0, 'wait_seconds': 0.0, 'navigations': 0, 'waits': 0}
+        results.append(_lookup(gabar, row, (first_name, 'Script'), new_result(row, gabar.name), [].append, job_cache, pool, _NoLimit(), record_timings))
+
+    # Only the first profile is tried over HTTP; the second record still searches over HTTP.
+    assert http_profiles == [f"{fixture_site}/member-directory/?id=2001"]
+    assert browser_profiles == [f"{fixture_site}/member-directory/?id=2001", f"{fixture_site}/member-directory/?id=2002"]
+    assert pool.checkouts == 2
+    assert [result['status'] for result in results] == ['Active Member in Good Standing'] * 2
+
+# --- Profile errors ---
+
+def test_unreadable_profile_marks_the_result(gabar):
+    def read_profile(url, admit_date_key):
+        if url.endswith('1001'):
+            raise TimeoutException("profile did not load")
+        return gabar.read_profile_http(url)
+
+    row = normalized_row(gabar, 'John', 'Smith', '2001-03-07')
+    result = match_record(
+        gabar, row, ('John', 'Smith'), new_result(row, gabar.name), [].append, JobCache(),
+        gabar.search_http, read_profile,
+    )
+    assert result['status'] == 'Admit Date Mismatch'
+    assert result[PROFILE_ERRORS] == 1
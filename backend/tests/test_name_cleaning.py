@@ -0,0 +1,26 @@
+# backend/tests/test_name_cleaning.py
+
+import pytest
+from ai_utils import rule_based_clean
+
+@pytest.mark.parametrize('raw_first_name, cleaned', [
+    # The examples in CLEANING_RULES.
+    ("W. Michael", "Michael"),
+    ("Joseph 'Joe'", "Joseph"),
+    ("R.", "R"),
+    ("Mary-Beth", "Mary"),
+    # Other nickname spellings.
+    ('Joseph "Joe"', "Joseph"),
+    ("Joseph (Joe)", "Joseph"),
+    ("Joseph ‘Joe’", "Joseph"),
+    ("Michael", "Michael"),
+    # Left to the model.
+    ("W.Michael", None),
+    ("D'Andre 'Dre'", None),
+    ("D'Andre", None),
+    ("Mary Beth", None),
+    ("J. R.", None),
+    ("", None),
+])
+def test_rule_based_clean(raw_first_name, cleaned):
+    assert rule_based_clean(raw_first_name) == cleaned
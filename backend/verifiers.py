@@ -0,0 +1,18 @@
+# backend/verifiers.py
+
+from california_scraper import CaliforniaVerifier
+from georgia_scraper import GeorgiaVerifier
+
+# Every supported state bar, keyed by the `state` value the frontend sends.
+# Adding a state means writing an engine.StateVerifier subclass for its site
+# and listing it here.
+VERIFIERS = {verifier.name: verifier for verifier in (
+    GeorgiaVerifier(),
+    CaliforniaVerifier(),
+)}
+
+def get_verifier(state):
+    verifier = VERIFIERS.get(state)
+    if verifier is None:
+        raise ValueError("Invalid state provided")
+    return verifier
@@ -55,15 +55,28 @@ export default function App() {
   const [file, setFile] = useState(null);
   const [apiKey, setApiKey] = useState('');
   const [selectedState, setSelectedState] = useState('georgia');
+  const [states, setStates] = useState([{ name: 'georgia', label: 'Georgia' }, { name: 'california', label: 'California' }]);
   const [logs, setLogs] = useState(["Awaiting process start..."]);
   const [results, setResults] = useState([]);
   const [isRunning, setIsRunning] = useState(false);
   const [isFinished, setIsFinished] = useState(false);
   const [error, setError] = useState('');
+  const [rowErrors, setRowErrors] = useState(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [csvHeaders, setCsvHeaders] = useState([]);
   const [jobId, setJobId] = useState(null);
   const pollingIntervalRef = useRef(null);
+  const resultsOffsetRef = useRef(0);
+  const logOffsetRef = useRef(0);
+  const [progress, setProgress] = useState(null);
+  const RESULTS_PAGE_SIZE = 500;
+
+  useEffect(() => {
+    fetch(`${API_BASE_URL}/states`)
+      .then(response => response.ok ? response.json() : null)
+      .then(data => { if (data && data.states && data.states.length) setStates(data.states); })
+      .catch(() => {});
+  }, []);
 
   useEffect(() => {
     return () => {
@@ -110,10 +123,30 @@ export default function App() {
     } else { setError("Please upload a valid .csv file."); setFile(null); }
   };
 
+  // Appends a page of streamed results, keeping them in input row order.
+  const appendResults = (items) => {
+    if (!items || items.length === 0) return;
+    setResults(prev => [...prev, ...items].sort((a, b) => a.row - b.row));
+  };
+
+  const fetchRemainingResults = async (id) => {
+    while (true) {
+        const res = await fetch(`${API_BASE_URL}/status/${id}?since=${logOffsetRef.current}&offset=${resultsOffsetRef.current}&limit=${RESULTS_PAGE_SIZE}`);
+        if (!res.ok) return;
+        const data = await res.json();
+        if (data.logs && data.logs.length > 0) setLogs(prev => [...prev, ...data.logs]);
+        logOffsetRef.current = data.next_since ?? logOffsetRef.current;
+        const page = data.results || { items: [] };
+        appendResults(page.items);
+        resultsOffsetRef.current = page.next_offset ?? resultsOffsetRef.current;
+        if (!page.items || page.items.length === 0 || resultsOffsetRef.current >= page.total) return;
+    }
+  };
+
   const pollJobStatus = (id) => {
     pollingIntervalRef.current = setInterval(async () => {
         try {
-            const res = await fetch(`${API_BASE_URL}/status/${id}`);
+            const res = await fetch(`${API_BASE_URL}/status/${id}?since=${logOffsetRef.current}&offset=${resultsOffsetRef.current}&limit=${RESULTS_PAGE_SIZE}`);
             if (!res.ok) {
                 clearInterval(pollingIntervalRef.current);
                 setError("Could not retrieve job status.");
@@ -121,17 +154,22 @@ export default function App() {
                 return;
             }
             const data = await res.json();
-            setLogs(data.logs || []);
+            // Only new log lines are returned; append them to what we have.
+            if (data.logs && data.logs.length > 0) setLogs(prev => [...prev, ...data.logs]);
+            logOffsetRef.current = data.next_since ?? logOffsetRef.current;
+            setProgress(data.progress || null);
+            if (data.results) {
+                appendResults(data.results.items);
+                resultsOffsetRef.current = data.results.next_offset;
+            }
             
             const jobStatus = data.status;
             if (jobStatus === 'finished' || jobStatus === 'failed') {
                 clearInterval(pollingIntervalRef.current);
+                await fetchRemainingResults(id);
                 setIsRunning(false);
                 setIsFinished(true);
-                if (data.meta && data.meta.results) {
-                    setResults(JSON.parse(data.meta.results));
-                }
-                if (jobStatus === 'failed') {
+                if (jobStatus === 'failed' || (data.meta && data.meta.status === 'failed')) {
                     setError(data.meta.error || "Job failed without a specific error message.");
                 }
             }
@@ -147,7 +185,7 @@ export default function App() {
     if (!file || !apiKey || !columnMapping) { setError("Missing file, API key, or column mapping."); return; }
     
     setIsModalOpen(false);
-    setError(''); setIsRunning(true); setIsFinished(false); setLogs(["Submitting job to the queue..."]); setResults([]);
+    setError(''); setRowErrors(null); setIsRunning(true); setIsFinished(false); setLogs(["Submitting job to the queue..."]); setResults([]); setProgress(null); resultsOffsetRef.current = 0; logOffsetRef.current = 0;
     if (pollingIntervalRef.current) clearInterval(pollingIntervalRef.current);
 
     const formData = new FormData();
@@ -158,9 +196,14 @@ export default function App() {
 
     try {
       const response = await fetch(`${API_BASE_URL}/start-scraping`, { method: 'POST', body: formData });
-      if (!response.ok) { const errData = await response.json(); throw new Error(errData.error || 'Backend error'); }
-      
-      const { job_id } = await response.json();
+      if (!response.ok) {
+        const errData = await response.json();
+        if (errData.invalid_rows) setRowErrors(errData);
+        throw new Error(errData.error || 'Backend error');
+      }
+
+      const { job_id, ...summary } = await response.json();
+      if (summary.invalid_rows) setRowErrors(summary);
       setJobId(job_id);
       setLogs(prev => [...prev, `Job successfully submitted with ID: ${job_id}`, "Waiting for worker to start..."]);
       pollJobStatus(job_id);
@@ -172,14 +215,11 @@ export default function App() {
   };
   
   // --- THESE FUNCTIONS ARE NOW CORRECTLY INCLUDED ---
+  // The backend streams the CSV in input order from its result store.
   const downloadCSV = () => {
-    if(results.length === 0) return;
-    const headers = Object.keys(results[0]);
-    const csvContent = [ headers.join(','), ...results.map(row => headers.map(header => `"${row[header] || ''}"`).join(',')) ].join('\n');
-    const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
+    if (!jobId) return;
     const link = document.createElement('a');
-    const url = URL.createObjectURL(blob);
-    link.setAttribute('href', url);
+    link.setAttribute('href', `${API_BASE_URL}/results/${jobId}.csv`);
     link.setAttribute('download', `verification_results_${selectedState}.csv`);
     document.body.appendChild(link);
     link.click();
@@ -210,11 +250,18 @@ export default function App() {
             <div className="controls-column">
               <Card className="p-6">
                 <h2 className="section-title"><span className="step-number">1</span>Configuration</h2>
-                <div className="config-section"><label className="label">Select State</label><div className="state-selection">{['georgia', 'california'].map(state => (<button key={state} onClick={() => setSelectedState(state)} disabled={isRunning} className={`state-button ${selectedState === state ? 'active' : ''}`}>{state}</button>))}</div></div>
+                <div className="config-section"><label className="label">Select State</label><div className="state-selection">{states.map(state => (<button key={state.name} onClick={() => setSelectedState(state.name)} disabled={isRunning} className={`state-button ${selectedState === state.name ? 'active' : ''}`}>{state.label}</button>))}</div></div>
                 <div className="config-section"><label htmlFor="api-key" className="label">Gemini API Key</label><input type="password" id="api-key" value={apiKey} onChange={e => setApiKey(e.target.value)} disabled={isRunning} className="input-field" placeholder="Enter your API key" /></div>
                 <div className="config-section"><label className="label">Upload CSV File</label><div onDrop={isRunning ? null : handleDrop} onDragOver={isRunning ? null : handleDragOver} className={`dropzone ${isRunning ? 'disabled' : ''}`} onClick={isRunning ? null : () => document.getElementById('file-upload').click()}><input type="file" id="file-upload" className="hidden" onChange={handleFileChange} accept=".csv" disabled={isRunning} /><UploadCloud className="dropzone-icon" /><p className="dropzone-text">{file ? 'File ready:' : 'Drag & drop or click to upload'}</p>{file && <p className="filename">{file.name}</p>}</div></div>
                 {error && <div className="error-message"><AlertTriangle size={16} /> {error}</div>}
-                <div className="button-group">{isRunning && (<div className="running-indicator"><Loader className="spinner"/>Processing...</div>)}</div>
+                {rowErrors && (
+                  <div className="row-errors">
+                    <p><AlertTriangle size={16} /> {rowErrors.invalid_rows} of {rowErrors.total_rows} row(s) are invalid and won't be searched.</p>
+                    <ul>{rowErrors.row_errors.map(rowError => (<li key={rowError.row}>Row {rowError.row}: {rowError.errors.join(', ')}</li>))}</ul>
+                    {rowErrors.row_errors.length < rowErrors.invalid_rows && <p>Showing the first {rowErrors.row_errors.length}.</p>}
+                  </div>
+                )}
+                <div className="button-group">{isRunning && (<div className="running-indicator"><Loader className="spinner"/>{progress ? `Processing ${progress.done}/${progress.total}${progress.eta_seconds != null ? ` (about ${Math.ceil(progress.eta_seconds / 60)} min left)` : ''}` : 'Processing...'}</div>)}</div>
               </Card>
             </div>
             <div className="results-column">
@@ -222,12 +269,12 @@ export default function App() {
                   <h2 className="section-title"><span className="step-number">2</span>Live Process Log</h2>
                   <LogDisplay logs={logs} />
               </Card>
-              {isFinished && (
+              {(isFinished || results.length > 0) && (
                 <Card className="p-6 animate-fade-in">
-                    <div className="results-header"><div><h2 className="section-title"><span className="step-number">3</span>Results & Download</h2><p className="subtitle">Verification process completed.</p></div><button onClick={downloadCSV} className="download-button"><Download size={16} /> Download CSV</button></div>
+                    <div className="results-header"><div><h2 className="section-title"><span className="step-number">3</span>Results & Download</h2><p className="subtitle">{isFinished ? 'Verification process completed.' : `Partial results: ${results.length} record(s) so far.`}</p></div><button onClick={downloadCSV} className="download-button"><Download size={16} /> Download CSV</button></div>
                     <div className="stats-grid"><StatCard icon={<BarChart2 />} title="Total Processed" value={stats.total} color="text-cyan" /><StatCard icon={<CheckCircle />} title="Matched" value={stats.matched} color="text-green" /><StatCard icon={<XCircle />} title="Not Found" value={stats.notFound} color="text-red" /><StatCard icon={<AlertTriangle />} title="Mismatch" value={stats.mismatch} color="text-yellow" /></div>
                     <div className="table-container"><table className="results-table"><thead><tr><th><User size={14} />Name</th><th><Calendar size={14} />Admit Date</th><th><Cpu size={14} />Status</th><th>Discipline</th><th><LinkIcon size={14} />Links</th></tr></thead>
-                          <tbody>{results.map((row, index) => (<tr key={index}><td>{row['first name']} {row['last name']}</td><td>{row['admit date']}</td><td><span className={`status-pill ${row.status && row.status.toLowerCase().includes('active') ? 'status-green' : row.status && row.status.toLowerCase().includes('inactive') ? 'status-gray' : row.status && row.status.toLowerCase().includes('not found') ? 'status-red' : row.status && (row.status.toLowerCase().includes('mismatch') || row.status.toLowerCase().includes('failed')) ? 'status-yellow' : 'status-gray'}`}>{row.status || 'N/A'}</span></td><td>{row.discipline || 'N/A'}</td><td>{row['profile links'] && <a href={row['profile links']} target="_blank" rel="noopener noreferrer" className="link">Profile</a>}{row['unmatched profile links'] && <a href={row['unmatched profile links']} target="_blank" rel="noopener noreferrer" className="link-yellow">Unmatched</a>}</td></tr>))}</tbody>
+                          <tbody>{results.map((row) => (<tr key={row.row}><td>{row['first name']} {row['last name']}</td><td>{row['admit date']}</td><td><span className={`status-pill ${row.status && row.status.toLowerCase().includes('active') ? 'status-green' : row.status && row.status.toLowerCase().includes('inactive') ? 'status-gray' : row.status && row.status.toLowerCase().includes('not found') ? 'status-red' : row.status && (row.status.toLowerCase().includes('mismatch') || row.status.toLowerCase().includes('failed')) ? 'status-yellow' : 'status-gray'}`}>{row.status || 'N/A'}</span></td><td>{row.discipline || 'N/A'}</td><td>{row['profile links'] && <a href={row['profile links']} target="_blank" rel="noopener noreferrer" className="link">Profile</a>}{row['unmatched profile links'] && <a href={row['unmatched profile links']} target="_blank" rel="noopener noreferrer" className="link-yellow">Unmatched</a>}</td></tr>))}</tbody>
                     </table></div>
                 </Card>
               )}